@@ -1,43 +1,119 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QTabWidget, QTableWidget, QTableWidgetItem,
+                             QTableView, QAbstractItemView,
                              QPushButton, QDialog, QLabel, QLineEdit, QComboBox,
-                             QDateEdit, QTimeEdit, QTextEdit, QMessageBox, QGroupBox, QInputDialog)
-from PyQt6.QtCore import QDate, QTime, Qt
+                             QDateEdit, QTimeEdit, QTextEdit, QMessageBox, QGroupBox, QInputDialog,
+                             QCompleter, QFileDialog)
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtCore import QDate, QTime, QTimer, Qt
 from PyQt6.QtGui import QIntValidator
 import pymysql
-from config import DB_CONFIG
+from query_executor import QueryExecutor
+from table_models import LazyTableModel, ButtonDelegate
+from pagination import AppointmentPager, fetch_appointment_row, row_key
+from payment_queue import PAGE_SIZE as PAYMENT_PAGE_SIZE, PaymentQueue, record_payment
+from payment_queue import row_key as payment_row_key
+from change_feed import ChangeFeed
+from booking import SlotTakenError, book_slot, reschedule_slot, set_status
+from sequences import reserve_medical_record_numbers
+from reference_cache import get_reference_cache
+from patient_search import SEARCH_DELAY_MS, search_patients
+from patient_import import import_patients, write_error_report
+from export import export_appointments
+from export_dialog import start_export
+from lazy_tabs import LazyTabWidget
 from datetime import datetime, timedelta
 
 class AdminWindow(QMainWindow):
 
-    def __init__(self, user_info):
+    def __init__(self, session):
         super().__init__()
-        self.user_info = user_info
-        self.setWindowTitle(f"Администратор регистратуры - {user_info['full_name']}")
+        self.session = session
+        self.setWindowTitle(f"Администратор регистратуры - {session.full_name}")
         self.setGeometry(100, 100, 1200, 700)
+        self.query_executor = QueryExecutor(self)
+        self.query_executor.busy_changed.connect(self.show_loading)
+        self.appointments_pager = AppointmentPager()
+        self.payment_queue = PaymentQueue()
+        self.reference_cache = get_reference_cache()
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
 
         layout = QVBoxLayout()
-        tabs = QTabWidget()
+        self.tabs = LazyTabWidget()
 
-        tabs.addTab(self.create_patient_registration_tab(), "Регистрация пациента")
-        tabs.addTab(self.create_appointment_tab(), "Запись на приём")
-        tabs.addTab(self.create_appointments_management_tab(), "Управление записями")
-        tabs.addTab(self.create_payment_tab(), "Оплата услуг")
+        self.tabs.add_lazy_tab(self.create_patient_registration_tab, "Регистрация пациента")
+        self.tabs.add_lazy_tab(self.create_appointment_tab, "Запись на приём")
+        self.tabs.add_lazy_tab(self.create_appointments_management_tab, "Управление записями")
+        self.tabs.add_lazy_tab(self.create_payment_tab, "Оплата услуг")
 
-        layout.addWidget(tabs)
+        layout.addWidget(self.tabs)
         central_widget.setLayout(layout)
 
+        self.change_feed = ChangeFeed(parent=self)
+        self.change_feed.changed.connect(self.merge_appointment_changes)
+        self.change_feed.overflow.connect(self.reload_appointment_views)
+        self.change_feed.start()
+
+    def show_loading(self, busy):
+        if busy:
+            self.statusBar().showMessage("Загрузка данных...")
+        else:
+            self.statusBar().clearMessage()
+
+    def merge_appointment_changes(self, changes):
+
+        if self.tabs.is_built(self.create_appointments_management_tab):
+            for change in changes:
+                self.merge_appointment_row(change)
+
+        if self.tabs.is_built(self.create_payment_tab):
+            for change in changes:
+                self.merge_payment_row(change)
+            self.update_payment_queue_label()
+
+    def merge_appointment_row(self, change):
+
+        row = (change.id, change.patient_name, change.doctor_name, change.appointment_date,
+               change.appointment_time, change.appointment_type, change.status, change.cost)
+        doctor_id = self.appointments_pager.filters.get('doctor_id')
+        matches = self.appointments_pager.matches(row) and doctor_id in (None, change.doctor_id)
+
+        self.place_appointment_row(change.id, row, matches)
+
+    def place_appointment_row(self, app_id, row, matches):
+
+        self.appointments_model.place_row(app_id, row, row_key, matches, self.appointments_pager.covers,
+                                          reverse=True)
+
+    def merge_payment_row(self, change):
+
+        row = (change.id, change.medical_record_number, change.patient_name, change.doctor_name,
+               change.appointment_date, change.appointment_time, change.status, change.cost)
+        self.payment_model.place_row(change.id, row, payment_row_key, self.payment_queue.matches(change),
+                                     self.payment_queue.covers)
+
+    def reload_appointment_views(self):
+
+        if self.tabs.is_built(self.create_appointments_management_tab):
+            self.load_appointments_page('first')
+        if self.tabs.is_built(self.create_payment_tab):
+            self.load_payment_queue()
+
     def get_connection(self):
 
         try:
-            return pymysql.connect(**DB_CONFIG)
+            return self.session.connection()
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {e}")
             return None
 
+    def run_query(self, key, fetch, on_result, error_title):
+        self.query_executor.submit(
+            key, fetch, on_result,
+            lambda e: QMessageBox.critical(self, "Ошибка", f"{error_title}: {e}")
+        )
+
     def create_patient_registration_tab(self):
 
         widget = QWidget()
@@ -122,30 +198,62 @@ class AdminWindow(QMainWindow):
         btn_register.clicked.connect(self.register_patient)
         form_layout.addWidget(btn_register)
 
+        self.btn_import_patients = QPushButton("Импорт пациентов из CSV")
+        self.btn_import_patients.clicked.connect(self.import_patients_from_csv)
+        form_layout.addWidget(self.btn_import_patients)
+
         widget.setLayout(form_layout)
         return widget
 
+    def import_patients_from_csv(self):
+
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт пациентов", "", "CSV (*.csv);;Все файлы (*)")
+        if not path:
+            return
+
+        default_password = self.patient_password.text() or None
+
+        def fetch(connection):
+            return import_patients(connection, path, default_password=default_password)
+
+        def done(result):
+            self.btn_import_patients.setEnabled(True)
+            summary = result.summary()
+            if result.errors:
+                report_path = f"{path}.errors.csv"
+                try:
+                    write_error_report(report_path, result)
+                    summary += f"\n\nОтчёт об ошибках: {report_path}"
+                except OSError as e:
+                    summary += f"\n\nНе удалось сохранить отчёт об ошибках: {e}"
+            QMessageBox.information(self, "Импорт пациентов", summary)
+
+        def failed(error):
+            self.btn_import_patients.setEnabled(True)
+            QMessageBox.critical(self, "Ошибка", f"Ошибка импорта: {error}")
+
+        self.btn_import_patients.setEnabled(False)
+        self.query_executor.submit('patient_import', fetch, done, failed)
+
     def register_patient(self):
 
         if not self.patient_name.text():
             QMessageBox.warning(self, "Ошибка", "Введите ФИО пациента")
             return
 
+        patient_password = self.patient_password.text()
+        if not patient_password:
+            QMessageBox.warning(self, "Ошибка", "Введите пароль для входа в систему")
+            return
+
         connection = self.get_connection()
         if not connection:
             return
 
         try:
+            medical_record_number = reserve_medical_record_numbers(connection)[0]
             cursor = connection.cursor()
 
-            cursor.execute("select count(*) from patient")
-            count = cursor.fetchone()[0]
-            medical_record_number = f"MR-{str(count + 1).zfill(3)}"
-
-            cursor.execute("select id from patient where medical_record_number = %s", (medical_record_number,))
-            if cursor.fetchone():
-                medical_record_number = f"MR-{str(count + 2).zfill(3)}"
-
             birthdate = self.patient_birthdate.date().toPyDate()
             insurance_type = self.patient_insurance_type.currentText()
             policy_number = self.patient_policy_number.text() or None
@@ -154,13 +262,6 @@ class AdminWindow(QMainWindow):
             oms_policy = policy_number if insurance_type == 'ОМС' else None
             dms_policy = policy_number if insurance_type == 'ДМС' else None
 
-            patient_password = self.patient_password.text()
-            if not patient_password:
-                QMessageBox.warning(self, "Ошибка", "Введите пароль для входа в систему")
-                cursor.close()
-                connection.close()
-                return
-
             cursor.execute("""
                 insert into patient (medical_record_number, full_name, date_of_birth, gender,
                 address, phone, email, passport_series, passport_number, oms_policy, dms_policy,
@@ -191,16 +292,18 @@ class AdminWindow(QMainWindow):
                 patient_login = f"{patient_login}_{patient_id}"
 
             cursor.execute("""
-                insert into app_user (login, password, role, full_name)
-                values (%s, %s, %s, %s)
-            """, (patient_login, patient_password, 'PATIENT', self.patient_name.text()))
+                insert into app_user (login, password, role, full_name, patient_id)
+                values (%s, %s, %s, %s, %s)
+            """, (patient_login, patient_password, 'PATIENT', self.patient_name.text(), patient_id))
 
             connection.commit()
             QMessageBox.information(self, "Успех",
                                    f"Пациент зарегистрирован. Номер медкарты: {medical_record_number}\n"
                                    f"Логин для входа: {patient_login}")
 
-            self.load_patients()
+            if self.tabs.is_built(self.create_appointment_tab):
+                self.patient_search.setText(medical_record_number)
+                self.load_patients()
 
             self.patient_name.clear()
             self.patient_address.clear()
@@ -228,15 +331,33 @@ class AdminWindow(QMainWindow):
 
         patient_layout = QHBoxLayout()
         patient_layout.addWidget(QLabel("Пациент:"))
+        self.patient_search = QLineEdit()
+        self.patient_search.setPlaceholderText("Номер медкарты, ФИО, телефон или полис")
+        patient_layout.addWidget(self.patient_search)
+
+        self.patient_results = QStandardItemModel(self)
         self.appointment_patient = QComboBox()
-        self.load_patients()
+        self.appointment_patient.setModel(self.patient_results)
         patient_layout.addWidget(self.appointment_patient)
+
+        patient_completer = QCompleter(self.patient_results, self)
+        patient_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        patient_completer.activated.connect(self.select_found_patient)
+        self.patient_search.setCompleter(patient_completer)
+
+        self.patient_search_timer = QTimer(self)
+        self.patient_search_timer.setSingleShot(True)
+        self.patient_search_timer.setInterval(SEARCH_DELAY_MS)
+        self.patient_search_timer.timeout.connect(self.load_patients)
+        self.patient_search.textEdited.connect(self.patient_search_timer.start)
+
         btn_refresh_patients = QPushButton("Обновить")
         btn_refresh_patients.clicked.connect(self.load_patients)
         patient_layout.addWidget(btn_refresh_patients)
         form_layout.addLayout(patient_layout)
 
         self.appointment_specialization = QComboBox()
+        self.appointment_specialization.setModel(self.reference_cache.specialization_model())
         self.load_specializations()
         self.appointment_specialization.currentIndexChanged.connect(self.load_doctors_by_specialization)
         form_layout.addWidget(QLabel("Специализация:"))
@@ -246,9 +367,7 @@ class AdminWindow(QMainWindow):
         form_layout.addWidget(QLabel("Врач:"))
         form_layout.addWidget(self.appointment_doctor)
 
-        if self.appointment_specialization.count() > 0:
-
-            self.appointment_specialization.setCurrentIndex(0)
+        self.load_doctors_by_specialization()
 
         self.appointment_date = QDateEdit()
         self.appointment_date.setDate(QDate.currentDate())
@@ -286,85 +405,46 @@ class AdminWindow(QMainWindow):
 
     def load_patients(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.patient_search_timer.stop()
+        text = self.patient_search.text()
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select id, medical_record_number, full_name from patient order by full_name")
-            patients = cursor.fetchall()
+        def fetch(connection):
+            return search_patients(connection, text)
 
-            self.appointment_patient.clear()
+        def fill(patients):
+            self.patient_results.clear()
             for patient_id, record_num, name in patients:
-                self.appointment_patient.addItem(f"{record_num} - {name}", patient_id)
+                item = QStandardItem(f"{record_num} - {name}")
+                item.setData(patient_id, Qt.ItemDataRole.UserRole)
+                self.patient_results.appendRow(item)
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки пациентов: {e}")
-            if connection:
-                connection.close()
+            if self.patient_search.hasFocus() and len(patients) > 1:
+                self.patient_search.completer().complete()
 
-    def load_specializations(self):
+        self.run_query('patients', fetch, fill, "Ошибка поиска пациентов")
 
-        connection = self.get_connection()
-        if not connection:
-            return
+    def select_found_patient(self, text):
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select id, name from specialization order by name")
-            specializations = cursor.fetchall()
+        index = self.appointment_patient.findText(text)
+        if index >= 0:
+            self.appointment_patient.setCurrentIndex(index)
 
-            self.appointment_specialization.clear()
-            for spec_id, name in specializations:
-                self.appointment_specialization.addItem(name, spec_id)
+    def load_specializations(self):
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки специализаций: {e}")
-            if connection:
-                connection.close()
+        self.reference_cache.refresh(self.query_executor)
 
     def load_doctors_by_specialization(self, index=None):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        if index is not None and index >= 0:
+            spec_id = self.appointment_specialization.itemData(index)
+        else:
+            spec_id = self.appointment_specialization.currentData()
 
-        try:
-            if index is not None and index >= 0:
-                spec_id = self.appointment_specialization.itemData(index)
-            else:
-                spec_id = self.appointment_specialization.currentData()
-
-            if not spec_id:
-                self.appointment_doctor.clear()
-                return
-
-            cursor = connection.cursor()
-            cursor.execute("""
-                select id, full_name from doctor
-                where specialization_id = %s
-                order by full_name
-            """, (spec_id,))
-            doctors = cursor.fetchall()
-
-            self.appointment_doctor.clear()
-            for doctor_id, name in doctors:
-                self.appointment_doctor.addItem(name, doctor_id)
+        if not spec_id:
+            self.appointment_doctor.setModel(self.reference_cache.empty_model())
+            return
 
-            cursor.close()
-            connection.close()
-        except Exception as e:
-            print(f"Ошибка загрузки врачей: {e}")
-            if connection:
-                try:
-                    connection.close()
-                except:
-                    pass
+        self.appointment_doctor.setModel(self.reference_cache.doctor_model(spec_id))
 
     def calculate_appointment_cost(self):
 
@@ -386,6 +466,7 @@ class AdminWindow(QMainWindow):
 
             if not result:
                 QMessageBox.warning(self, "Ошибка", "Пациент не найден")
+                connection.close()
                 return
 
             insurance_type = result[0]
@@ -434,25 +515,8 @@ class AdminWindow(QMainWindow):
 
         try:
             cursor = connection.cursor()
-
-            cursor.execute("""
-                select id from appointment
-                where doctor_id = %s and appointment_date = %s and appointment_time = %s
-                and status not in ('Отменён', 'Не явился')
-            """, (doctor_id, appointment_date, appointment_time))
-
-            if cursor.fetchone():
-                QMessageBox.warning(self, "Ошибка", "Это время уже занято")
-                cursor.close()
-                connection.close()
-                return
-
-            cursor.execute("""
-                insert into appointment (patient_id, doctor_id, appointment_date, appointment_time,
-                appointment_type, status, cost)
-                values (%s, %s, %s, %s, %s, %s, %s)
-            """, (patient_id, doctor_id, appointment_date, appointment_time,
-                  appointment_type, 'Запланирован', float(cost)))
+            book_slot(cursor, patient_id, doctor_id, appointment_date, appointment_time,
+                      appointment_type, float(cost))
 
             connection.commit()
             QMessageBox.information(self, "Успех", "Запись на приём создана")
@@ -461,6 +525,9 @@ class AdminWindow(QMainWindow):
 
             cursor.close()
             connection.close()
+        except SlotTakenError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            connection.close()
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка создания записи: {e}")
             if connection:
@@ -486,7 +553,7 @@ class AdminWindow(QMainWindow):
         filter_layout.addWidget(self.filter_date_to)
 
         self.filter_doctor = QComboBox()
-        self.filter_doctor.addItem("Все врачи", None)
+        self.filter_doctor.setModel(self.reference_cache.doctor_model(all_label="Все врачи"))
         self.load_all_doctors()
         filter_layout.addWidget(QLabel("Врач:"))
         filter_layout.addWidget(self.filter_doctor)
@@ -508,13 +575,32 @@ class AdminWindow(QMainWindow):
         filter_group.setLayout(filter_layout)
         layout.addWidget(filter_group)
 
-        self.appointments_table = QTableWidget()
-        self.appointments_table.setColumnCount(9)
-        self.appointments_table.setHorizontalHeaderLabels([
-            "ID", "Пациент", "Врач", "Дата", "Время", "Тип", "Статус", "Стоимость", "Действия"
-        ])
+        self.appointments_model = LazyTableModel([
+            ("ID", 0), ("Пациент", 1), ("Врач", 2), ("Дата", 3), ("Время", 4),
+            ("Тип", 5), ("Статус", 6), ("Стоимость", 7), ("Действия", None)
+        ], parent=self)
+        self.appointments_table = QTableView()
+        self.appointments_table.setModel(self.appointments_model)
+        self.appointments_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.appointments_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        select_delegate = ButtonDelegate("Выбрать", self.appointments_table)
+        select_delegate.clicked.connect(self.appointments_table.selectRow)
+        self.appointments_table.setItemDelegateForColumn(8, select_delegate)
         layout.addWidget(self.appointments_table)
 
+        page_layout = QHBoxLayout()
+        self.btn_previous_page = QPushButton("< Назад")
+        self.btn_previous_page.clicked.connect(self.load_previous_page)
+        page_layout.addWidget(self.btn_previous_page)
+
+        self.appointments_page_label = QLabel()
+        page_layout.addWidget(self.appointments_page_label)
+
+        self.btn_next_page = QPushButton("Вперёд >")
+        self.btn_next_page.clicked.connect(self.load_next_page)
+        page_layout.addWidget(self.btn_next_page)
+        layout.addLayout(page_layout)
+
         btn_layout = QHBoxLayout()
         btn_update_status = QPushButton("Изменить статус")
         btn_update_status.clicked.connect(self.update_appointment_status)
@@ -528,6 +614,10 @@ class AdminWindow(QMainWindow):
         btn_reschedule.clicked.connect(self.reschedule_appointment)
         btn_layout.addWidget(btn_reschedule)
 
+        btn_export = QPushButton("Экспорт")
+        btn_export.clicked.connect(self.export_appointments)
+        btn_layout.addWidget(btn_export)
+
         layout.addLayout(btn_layout)
 
         widget.setLayout(layout)
@@ -536,140 +626,69 @@ class AdminWindow(QMainWindow):
 
     def load_all_doctors(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.reference_cache.refresh(self.query_executor)
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select id, full_name from doctor order by full_name")
-            doctors = cursor.fetchall()
+    def export_appointments(self):
 
-            for doctor_id, name in doctors:
-                self.filter_doctor.addItem(name, doctor_id)
+        filters = dict(self.appointments_pager.filters)
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            if connection:
-                connection.close()
+        def job(connection, path, progress):
+            return export_appointments(connection, path, filters, progress)
+
+        start_export(self, self.query_executor, "Экспорт записей", job)
 
     def load_all_appointments(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.appointments_pager.reset()
+        self.load_appointments_page('first', "Ошибка загрузки записей")
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                select a.id, p.full_name, d.full_name, a.appointment_date, a.appointment_time,
-                a.appointment_type, a.status, a.cost
-                from appointment a
-                join patient p on a.patient_id = p.id
-                join doctor d on a.doctor_id = d.id
-                order by a.appointment_date desc, a.appointment_time desc
-            """)
-            appointments = cursor.fetchall()
-
-            self.appointments_table.setRowCount(len(appointments))
-            for row, (app_id, patient, doctor, date, time, app_type, status, cost) in enumerate(appointments):
-                self.appointments_table.setItem(row, 0, QTableWidgetItem(str(app_id)))
-                self.appointments_table.setItem(row, 1, QTableWidgetItem(patient))
-                self.appointments_table.setItem(row, 2, QTableWidgetItem(doctor))
-                self.appointments_table.setItem(row, 3, QTableWidgetItem(str(date)))
-                self.appointments_table.setItem(row, 4, QTableWidgetItem(str(time)))
-                self.appointments_table.setItem(row, 5, QTableWidgetItem(app_type))
-                self.appointments_table.setItem(row, 6, QTableWidgetItem(status))
-                self.appointments_table.setItem(row, 7, QTableWidgetItem(str(cost)))
-
-                btn = QPushButton("Выбрать")
-                btn.setProperty("appointment_id", app_id)
-                self.appointments_table.setCellWidget(row, 8, btn)
+    def filter_appointments(self):
 
-            self.appointments_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки записей: {e}")
-            if connection:
-                connection.close()
+        status = self.filter_status.currentText()
+        self.appointments_pager.reset(
+            date_from=self.filter_date_from.date().toPyDate(),
+            date_to=self.filter_date_to.date().toPyDate(),
+            doctor_id=self.filter_doctor.currentData(),
+            status=status if status != "Все статусы" else None
+        )
+        self.load_appointments_page('first', "Ошибка фильтрации")
 
-    def filter_appointments(self):
+    def load_previous_page(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.load_appointments_page('previous')
 
-        try:
-            cursor = connection.cursor()
+    def load_next_page(self):
+
+        self.load_appointments_page('next')
+
+    def load_appointments_page(self, direction, error_title="Ошибка загрузки записей"):
+
+        self.btn_previous_page.setEnabled(False)
+        self.btn_next_page.setEnabled(False)
+        self.run_query('appointments', self.appointments_pager.request(direction),
+                       self.fill_appointments_table, error_title)
 
-            date_from = self.filter_date_from.date().toPyDate()
-            date_to = self.filter_date_to.date().toPyDate()
-            doctor_id = self.filter_doctor.currentData()
-            status = self.filter_status.currentText()
-
-            query = """
-                select a.id, p.full_name, d.full_name, a.appointment_date, a.appointment_time,
-                a.appointment_type, a.status, a.cost
-                from appointment a
-                join patient p on a.patient_id = p.id
-                join doctor d on a.doctor_id = d.id
-                where a.appointment_date between %s and %s
-            """
-            params = [date_from, date_to]
-
-            if doctor_id:
-                query += " and a.doctor_id = %s"
-                params.append(doctor_id)
-
-            if status != "Все статусы":
-                query += " and a.status = %s"
-                params.append(status)
-
-            query += " order by a.appointment_date desc, a.appointment_time desc"
-
-            cursor.execute(query, params)
-            appointments = cursor.fetchall()
-
-            self.appointments_table.setRowCount(len(appointments))
-            for row, (app_id, patient, doctor, date, time, app_type, status_val, cost) in enumerate(appointments):
-                self.appointments_table.setItem(row, 0, QTableWidgetItem(str(app_id)))
-                self.appointments_table.setItem(row, 1, QTableWidgetItem(patient))
-                self.appointments_table.setItem(row, 2, QTableWidgetItem(doctor))
-                self.appointments_table.setItem(row, 3, QTableWidgetItem(str(date)))
-                self.appointments_table.setItem(row, 4, QTableWidgetItem(str(time)))
-                self.appointments_table.setItem(row, 5, QTableWidgetItem(app_type))
-                self.appointments_table.setItem(row, 6, QTableWidgetItem(status_val))
-                self.appointments_table.setItem(row, 7, QTableWidgetItem(str(cost)))
-
-                btn = QPushButton("Выбрать")
-                btn.setProperty("appointment_id", app_id)
-                self.appointments_table.setCellWidget(row, 8, btn)
+    def fill_appointments_table(self, page):
 
+        rows = self.appointments_pager.apply(page)
+        if rows is not None:
+            self.appointments_model.set_rows(rows)
             self.appointments_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка фильтрации: {e}")
-            if connection:
-                connection.close()
 
-    def get_selected_appointment_id(self):
-        try:
-            current_row = self.appointments_table.currentRow()
-            if current_row < 0:
-                return None
+        self.btn_previous_page.setEnabled(self.appointments_pager.has_previous)
+        self.btn_next_page.setEnabled(self.appointments_pager.has_next)
+        self.appointments_page_label.setText(self.appointments_pager.describe())
 
-            item = self.appointments_table.item(current_row, 0)
-            if item:
-                try:
-                    return int(item.text())
-                except (ValueError, TypeError):
-                    return None
-            return None
-        except Exception:
+    def patch_appointment_row(self, app_id, row):
+
+        self.place_appointment_row(app_id, row, row is not None and self.appointments_pager.matches(row))
+
+    def get_selected_appointment_id(self):
+        current_row = self.appointments_table.currentIndex().row()
+        row = self.appointments_model.row(current_row)
+        if row is None:
             return None
+        return row[0]
 
     def update_appointment_status(self):
 
@@ -695,17 +714,17 @@ class AdminWindow(QMainWindow):
 
         try:
             cursor = connection.cursor()
-            cursor.execute("update appointment set status = %s where id = %s", (status, app_id))
+            set_status(cursor, app_id, status)
+            row = fetch_appointment_row(cursor, app_id)
             connection.commit()
             QMessageBox.information(self, "Успех", "Статус обновлён")
-
-            try:
-                self.load_all_appointments()
-            except Exception as e:
-                print(f"Ошибка обновления таблицы: {e}")
+            self.patch_appointment_row(app_id, row)
 
             cursor.close()
             connection.close()
+        except SlotTakenError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            connection.close()
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка обновления: {e}")
             if connection:
@@ -739,9 +758,10 @@ class AdminWindow(QMainWindow):
         try:
             cursor = connection.cursor()
             cursor.execute("update appointment set status = 'Отменён' where id = %s", (app_id,))
+            row = fetch_appointment_row(cursor, app_id)
             connection.commit()
             QMessageBox.information(self, "Успех", "Запись отменена")
-            self.load_all_appointments()
+            self.patch_appointment_row(app_id, row)
             cursor.close()
             connection.close()
         except pymysql.Error as e:
@@ -790,36 +810,24 @@ class AdminWindow(QMainWindow):
 
             try:
                 cursor = connection.cursor()
-
-                cursor.execute("""
-                    select id from appointment
-                    where doctor_id = (select doctor_id from appointment where id = %s)
-                    and appointment_date = %s and appointment_time = %s
-                    and id != %s and status not in ('Отменён', 'Не явился')
-                """, (app_id, new_date.date().toPyDate(), new_time.time().toPyTime(), app_id))
-
-                if cursor.fetchone():
-                    QMessageBox.warning(dialog, "Ошибка", "Это время уже занято")
-                    return
-
-                cursor.execute("""
-                    update appointment
-                    set appointment_date = %s, appointment_time = %s
-                    where id = %s
-                """, (new_date.date().toPyDate(), new_time.time().toPyTime(), app_id))
+                reschedule_slot(cursor, app_id, new_date.date().toPyDate(), new_time.time().toPyTime())
+                row = fetch_appointment_row(cursor, app_id)
 
                 connection.commit()
                 QMessageBox.information(dialog, "Успех", "Запись перенесена")
                 dialog.accept()
-                self.load_all_appointments()
+                self.patch_appointment_row(app_id, row)
                 cursor.close()
                 connection.close()
+            except SlotTakenError as e:
+                QMessageBox.warning(dialog, "Ошибка", str(e))
+                connection.close()
             except pymysql.Error as e:
                 QMessageBox.critical(dialog, "Ошибка", f"Ошибка переноса: {e}")
                 if connection:
                     connection.close()
 
-        btn_ok.clicked.conn7ect(apply_reschedule)
+        btn_ok.clicked.connect(apply_reschedule)
         btn_cancel.clicked.connect(dialog.reject)
 
         dialog.exec()
@@ -828,64 +836,95 @@ class AdminWindow(QMainWindow):
         widget = QWidget()
         layout = QVBoxLayout()
 
-        form_layout = QVBoxLayout()
-
-        self.payment_appointment = QComboBox()
-        self.load_appointments_for_payment()
-        form_layout.addWidget(QLabel("Запись на приём:"))
-        form_layout.addWidget(self.payment_appointment)
-
+        filter_layout = QHBoxLayout()
+        self.payment_day = QDateEdit()
+        self.payment_day.setDate(QDate.currentDate())
+        self.payment_day.setCalendarPopup(True)
+        self.payment_day.dateChanged.connect(self.load_payment_queue)
+        filter_layout.addWidget(QLabel("Дата приёма:"))
+        filter_layout.addWidget(self.payment_day)
+
+        self.payment_search = QLineEdit()
+        self.payment_search.setPlaceholderText("Пациент: номер медкарты, ФИО, телефон или полис")
+        filter_layout.addWidget(self.payment_search)
+
+        self.payment_search_timer = QTimer(self)
+        self.payment_search_timer.setSingleShot(True)
+        self.payment_search_timer.setInterval(SEARCH_DELAY_MS)
+        self.payment_search_timer.timeout.connect(self.load_payment_queue)
+        self.payment_search.textEdited.connect(self.payment_search_timer.start)
+
+        btn_refresh = QPushButton("Обновить")
+        btn_refresh.clicked.connect(self.load_payment_queue)
+        filter_layout.addWidget(btn_refresh)
+        layout.addLayout(filter_layout)
+
+        self.payment_model = LazyTableModel([
+            ("ID", 0), ("Медкарта", 1), ("Пациент", 2), ("Врач", 3), ("Дата", 4),
+            ("Время", 5), ("Статус", 6), ("Стоимость", 7)
+        ], batch_size=PAYMENT_PAGE_SIZE, parent=self)
+        self.payment_model.fetch_more_requested.connect(self.load_more_payments)
+        self.payment_table = QTableView()
+        self.payment_table.setModel(self.payment_model)
+        self.payment_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.payment_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        layout.addWidget(self.payment_table)
+
+        self.payment_queue_label = QLabel()
+        layout.addWidget(self.payment_queue_label)
+
+        pay_layout = QHBoxLayout()
         self.payment_method = QComboBox()
         self.payment_method.addItems(['Наличные', 'Карта', 'По полису'])
-        form_layout.addWidget(QLabel("Способ оплаты:"))
-        form_layout.addWidget(self.payment_method)
+        pay_layout.addWidget(QLabel("Способ оплаты:"))
+        pay_layout.addWidget(self.payment_method)
 
         btn_pay = QPushButton("Оформить оплату")
         btn_pay.clicked.connect(self.process_payment)
-        form_layout.addWidget(btn_pay)
+        pay_layout.addWidget(btn_pay)
+        layout.addLayout(pay_layout)
 
-        widget.setLayout(form_layout)
+        widget.setLayout(layout)
+        self.load_payment_queue()
         return widget
 
-    def load_appointments_for_payment(self):
+    def load_payment_queue(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.payment_search_timer.stop()
+        self.payment_queue.reset(self.payment_day.date().toPyDate(), self.payment_search.text())
+        self.payment_model.set_rows([])
+        self.load_payment_page()
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                select a.id, p.full_name, d.full_name, a.appointment_date, a.cost, a.payment_method
-                from appointment a
-                join patient p on a.patient_id = p.id
-                join doctor d on a.doctor_id = d.id
-                where a.status in ('Завершён', 'Запланирован', 'Пациент на приёме')
-                order by a.appointment_date desc
-            """)
-            appointments = cursor.fetchall()
-
-            self.payment_appointment.clear()
-            for app_id, patient, doctor, date, cost, payment_method in appointments:
-                payment_status = f" (Оплачено: {payment_method})" if payment_method else ""
-                self.payment_appointment.addItem(
-                    f"{date} - {patient} - {doctor} - {cost} руб.{payment_status}",
-                    app_id
-                )
+    def load_payment_page(self, append=False):
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки записей: {e}")
-            if connection:
-                connection.close()
+        self.run_query('payment_queue', self.payment_queue.request(append),
+                       self.fill_payment_queue, "Ошибка загрузки записей")
+
+    def load_more_payments(self):
+
+        self.load_payment_page(append=True)
+
+    def fill_payment_queue(self, result):
+
+        page = self.payment_queue.apply(result)
+        if page.append:
+            self.payment_model.append_rows(page.rows, page.has_more)
+        else:
+            self.payment_model.set_rows(page.rows, page.has_more)
+            self.payment_table.resizeColumnsToContents()
+        self.update_payment_queue_label()
+
+    def update_payment_queue_label(self):
+
+        self.payment_queue_label.setText(self.payment_queue.describe(self.payment_model.loaded_count()))
 
     def process_payment(self):
 
-        app_id = self.payment_appointment.currentData()
+        current_row = self.payment_table.currentIndex().row()
+        row = self.payment_model.row(current_row)
         payment_method = self.payment_method.currentText()
 
-        if not app_id:
+        if row is None:
             QMessageBox.warning(self, "Ошибка", "Выберите запись")
             return
 
@@ -895,18 +934,19 @@ class AdminWindow(QMainWindow):
 
         try:
             cursor = connection.cursor()
-            cursor.execute("""
-                update appointment
-                set payment_method = %s
-                where id = %s
-            """, (payment_method, app_id))
-
+            paid = record_payment(cursor, row[0], payment_method)
             connection.commit()
-            QMessageBox.information(self, "Успех", "Оплата оформлена")
-            self.load_appointments_for_payment()
             cursor.close()
             connection.close()
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка оплаты: {e}")
             if connection:
                 connection.close()
+            return
+
+        if paid:
+            QMessageBox.information(self, "Успех", "Оплата оформлена")
+        else:
+            QMessageBox.warning(self, "Ошибка", "Запись уже оплачена")
+        self.payment_model.remove_row(current_row)
+        self.update_payment_queue_label()
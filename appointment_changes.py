@@ -0,0 +1,66 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from config import CHANGE_FEED_CONFIG
+from indexes import ensure_indexes
+
+CHANGE_INDEXES = [
+    ('appointment', 'idx_appointment_updated_at', 'updated_at', False),
+]
+
+CHANGE_COLUMNS = """
+    select a.id, a.patient_id, a.doctor_id, p.medical_record_number, p.full_name, d.full_name,
+    a.appointment_date, a.appointment_time, a.appointment_type, a.status, a.cost,
+    a.payment_method, a.updated_at
+    from appointment a
+    join patient p on a.patient_id = p.id
+    join doctor d on a.doctor_id = d.id
+"""
+
+AppointmentChange = namedtuple('AppointmentChange', [
+    'id', 'patient_id', 'doctor_id', 'medical_record_number', 'patient_name', 'doctor_name',
+    'appointment_date', 'appointment_time', 'appointment_type', 'status', 'cost',
+    'payment_method', 'updated_at'
+])
+
+
+def ensure_change_tracking(cursor):
+    cursor.execute("""
+        select count(*) from information_schema.columns
+        where table_schema = database() and table_name = 'appointment' and column_name = 'updated_at'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            alter table appointment
+            add column updated_at timestamp(6) not null
+            default current_timestamp(6) on update current_timestamp(6)
+        """)
+    ensure_indexes(cursor, CHANGE_INDEXES)
+
+
+def current_watermark(connection):
+    cursor = connection.cursor()
+    cursor.execute("select coalesce(max(updated_at), now(6)) from appointment")
+    watermark = cursor.fetchone()[0]
+    cursor.close()
+    return watermark
+
+
+def fetch_changes(connection, since, patient_id=None, overlap_seconds=CHANGE_FEED_CONFIG['overlap_seconds'],
+                  max_rows=CHANGE_FEED_CONFIG['max_rows']):
+    query = CHANGE_COLUMNS + " where a.updated_at > %s"
+    params = [since - timedelta(seconds=overlap_seconds)]
+    if patient_id is not None:
+        query += " and a.patient_id = %s"
+        params.append(patient_id)
+    query += " order by a.updated_at, a.id limit %s"
+    params.append(max_rows + 1)
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = [AppointmentChange(*row) for row in cursor.fetchall()]
+    cursor.close()
+
+    if len(rows) > max_rows:
+        return current_watermark(connection), None
+    return max([since] + [row.updated_at for row in rows]), rows
@@ -1,29 +1,38 @@
 import pymysql
-from config import DB_CONFIG
+from db import pooled_connection
+
+
+class Session:
+
+    def __init__(self, user_id, login, role, full_name, patient_id=None, insurance_type=None):
+        self.user_id = user_id
+        self.login = login
+        self.role = role
+        self.full_name = full_name
+        self.patient_id = patient_id
+        self.insurance_type = insurance_type
+
+    def connection(self):
+        return pooled_connection()
 
 
 def authenticate(login, password):
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        cursor = connection.cursor()
-        
-        cursor.execute("""
-            select id, login, role, full_name 
-            from app_user 
-            where login = %s and password = %s
-        """, (login, password))
-        
-        result = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+
+            cursor.execute("""
+                select u.id, u.login, u.role, u.full_name, p.id, p.insurance_type
+                from app_user u
+                left join patient p on p.id = u.patient_id
+                where u.login = %s and u.password = %s
+            """, (login, password))
+
+            result = cursor.fetchone()
+            cursor.close()
         
         if result:
-            return {
-                'id': result[0],
-                'login': result[1],
-                'role': result[2],
-                'full_name': result[3]
-            }
+            return Session(*result)
         return None
     except pymysql.Error as e:
         print(f"Ошибка авторизации: {e}")
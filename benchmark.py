@@ -0,0 +1,279 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+import pymysql
+from booking import SlotTakenError, book_slot
+from clinic_stats import COMPLETED, STATUSES, build_statistics
+from pagination import AppointmentPager
+from patient_search import search_patients
+from rollup import doctors_workload, rollup_statistics
+from schedule import load_availability, load_slot_bitmaps
+
+REPEATS = 5
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def baseline_statistics(connection, date_from=None, date_to=None, with_patients=False):
+    status_columns = ",\n".join("sum(status = %s)" for _ in STATUSES)
+    query = f"""
+        select count(*),
+        {status_columns},
+        sum(case when status = %s then cost else 0 end)
+    """
+    params = list(STATUSES) + [COMPLETED]
+
+    if with_patients:
+        query += ", (select count(*) from patient)"
+    query += " from appointment"
+
+    if date_from and date_to:
+        query += " where appointment_date between %s and %s"
+        params.extend([date_from, date_to])
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    cursor.close()
+
+    total = int(row[0] or 0)
+    status_counts = row[1:1 + len(STATUSES)]
+    revenue = row[1 + len(STATUSES)]
+    patients = int(row[2 + len(STATUSES)] or 0) if with_patients else None
+    return build_statistics(total, status_counts, revenue, patients)
+
+
+def result_size(result):
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    return 1 if result is not None else 0
+
+
+def measure(connection, run, repeats):
+    run(connection)
+    timings = []
+    rows = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = run(connection)
+        timings.append((time.perf_counter() - started) * 1000)
+        rows = result_size(result)
+    return {
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'max_ms': round(max(timings), 3),
+        'rows': rows
+    }
+
+
+def scalar(connection, query, params=()):
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def dataset_info(connection):
+    return {
+        'mysql_version': scalar(connection, "select version()"),
+        'doctors': scalar(connection, "select count(*) from doctor"),
+        'patients': scalar(connection, "select count(*) from patient"),
+        'appointments': scalar(connection, "select count(*) from appointment"),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pick_parameters(connection, seed, anchor):
+    rng = random.Random(seed)
+    doctor_count = scalar(connection, "select count(*) from doctor") or 0
+    doctor_id = scalar(connection, "select id from doctor order by id limit 1 offset %s",
+                       (rng.randrange(doctor_count),)) if doctor_count else None
+    busy_slot = None
+    if doctor_id:
+        cursor = connection.cursor()
+        cursor.execute("""
+            select appointment_date, appointment_time from appointment
+            where doctor_id = %s and active_slot = 1 and appointment_date >= %s
+            order by appointment_date, appointment_time limit 1
+        """, (doctor_id, anchor))
+        busy_slot = cursor.fetchone()
+        cursor.close()
+    patient_id = scalar(connection, "select id from patient order by id limit 1")
+    patient_name = scalar(connection, "select full_name from patient where id = %s",
+                          (patient_id,)) if patient_id else None
+    return {
+        'patient_id': patient_id,
+        'doctor_id': doctor_id,
+        'specialization_id': scalar(connection, "select specialization_id from doctor where id = %s",
+                                    (doctor_id,)) if doctor_id else None,
+        'busy_slot': busy_slot,
+        'search_text': patient_name.split()[0][:4] if patient_name else "Ива",
+    }
+
+
+def page_fetch(filters, pages=1):
+    pager = AppointmentPager()
+
+    def run(connection):
+        pager.reset(**filters)
+        rows = None
+        for direction in ['first'] + ['next'] * (pages - 1):
+            rows = pager.apply(pager.request(direction)(connection))
+        return rows
+
+    return run
+
+
+def conflict_check(patient_id, doctor_id, busy_slot):
+    appointment_date, appointment_time = busy_slot
+    if isinstance(appointment_time, timedelta):
+        appointment_time = (datetime.min + appointment_time).time()
+
+    def run(connection):
+        cursor = connection.cursor()
+        try:
+            book_slot(cursor, patient_id, doctor_id, appointment_date, appointment_time, 'Первичный', 0)
+            taken = False
+        except SlotTakenError:
+            taken = True
+        finally:
+            connection.rollback()
+            cursor.close()
+        return [taken]
+
+    return run
+
+
+def benchmark_cases(params, anchor):
+    month_ago = anchor - timedelta(days=30)
+    cases = [
+        ("load_all_appointments: первая страница", page_fetch({})),
+        ("load_all_appointments: 5 страниц вперёд", page_fetch({}, pages=5)),
+        ("filter_appointments: статус за месяц", page_fetch(
+            {'date_from': month_ago, 'date_to': anchor, 'status': COMPLETED})),
+        ("load_schedule: день, все врачи", lambda c: load_availability(c, anchor, 1)),
+        ("load_schedule: неделя, все врачи", lambda c: load_availability(c, anchor, 7)),
+        ("поиск пациента", lambda c: search_patients(c, params['search_text'])),
+        ("статистика главного врача", lambda c: rollup_statistics(c, with_patients=True)),
+        ("статистика за месяц", lambda c: rollup_statistics(c, month_ago, anchor)),
+        ("загруженность врачей", doctors_workload),
+        ("статистика по таблице записей за месяц (до сводной таблицы)",
+         lambda c: baseline_statistics(c, month_ago, anchor)),
+    ]
+
+    doctor_id = params['doctor_id']
+    if doctor_id:
+        cases.insert(3, ("filter_appointments: врач", page_fetch({'doctor_id': doctor_id})))
+        cases.insert(6, ("load_schedule: неделя, специализация",
+                         lambda c: load_availability(c, anchor, 7, params['specialization_id'])))
+        cases.insert(7, ("свободное время врача на неделю",
+                         lambda c: load_slot_bitmaps(c, doctor_id, anchor, 7)))
+    if doctor_id and params['busy_slot'] and params['patient_id']:
+        cases.append(("проверка конфликта при записи",
+                      conflict_check(params['patient_id'], doctor_id, params['busy_slot'])))
+    return cases
+
+
+def run_benchmarks(connection, repeats=REPEATS, seed=42, anchor=None, only=None):
+    anchor = anchor or date.today()
+    params = pick_parameters(connection, seed, anchor)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'seed': seed,
+        'anchor_date': anchor.isoformat(),
+        'repeats': repeats,
+        'dataset': dataset_info(connection),
+        'results': {}
+    }
+    for name, run in benchmark_cases(params, anchor):
+        if only and only not in name:
+            continue
+        report['results'][name] = measure(connection, run, repeats)
+        print(format_line(name, report['results'][name]))
+    return report
+
+
+def format_line(name, result, baseline=None):
+    line = f"{name:<45} {result['median_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['rows']:>8}"
+    if baseline:
+        change = (result['median_ms'] - baseline['median_ms']) / baseline['median_ms'] * 100 \
+            if baseline['median_ms'] else 0.0
+        line += f" {baseline['median_ms']:>10.2f} {change:>+8.1f}%"
+    return line
+
+
+def print_comparison(baseline, current):
+    print(f"Базовый отчёт: {baseline.get('revision')} от {baseline.get('created_at')}, {baseline.get('dataset')}")
+    print(f"Текущий отчёт: {current.get('revision')} от {current.get('created_at')}, {current.get('dataset')}")
+    print(f"{'Запрос':<45} {'медиана':>10} {'p95':>10} {'строк':>8} {'было':>10} {'изм.':>9}")
+    for name, result in current['results'].items():
+        print(format_line(name, result, baseline['results'].get(name)))
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as report_file:
+        return json.load(report_file)
+
+
+def main(argv=None):
+    from db import get_connection
+
+    parser = argparse.ArgumentParser(description="Замер времени основных запросов приложения")
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor-date', type=date.fromisoformat, default=None)
+    parser.add_argument('--only', help="запускать только замеры, содержащие эту строку")
+    parser.add_argument('--output', help="сохранить отчёт в JSON")
+    parser.add_argument('--compare', nargs='+', metavar='REPORT',
+                        help="сравнить с базовым отчётом (или два сохранённых отчёта)")
+    args = parser.parse_args(argv)
+
+    if args.compare and len(args.compare) == 2:
+        print_comparison(load_report(args.compare[0]), load_report(args.compare[1]))
+        return 0
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    print(f"{'Запрос':<45} {'медиана':>10} {'p95':>10} {'строк':>8}")
+    try:
+        report = run_benchmarks(connection, args.repeats, args.seed, args.anchor_date, args.only)
+    except pymysql.Error as e:
+        print(f"Ошибка замера: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+    if args.compare:
+        print()
+        print_comparison(load_report(args.compare[0]), report)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+import pymysql
+from pymysql.constants import ER
+
+SLOT_TAKEN_MESSAGE = "Это время уже занято"
+SLOT_INDEX = 'uq_appointment_active_slot'
+INACTIVE_STATUSES = ('Отменён', 'Не явился')
+
+
+class SlotTakenError(Exception):
+
+    def __init__(self, message=SLOT_TAKEN_MESSAGE):
+        super().__init__(message)
+
+
+def is_slot_conflict(error):
+    return (isinstance(error, pymysql.IntegrityError)
+            and error.args[0] == ER.DUP_ENTRY
+            and SLOT_INDEX in str(error.args[1]))
+
+
+def ensure_slot_constraint(cursor):
+    cursor.execute("""
+        select count(*) from information_schema.columns
+        where table_schema = database() and table_name = 'appointment' and column_name = 'active_slot'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            alter table appointment
+            add column active_slot tinyint
+            as (case when status in ('Отменён', 'Не явился') then null else 1 end) virtual
+        """)
+
+
+def execute_slot_statement(cursor, query, params):
+    try:
+        cursor.execute(query, params)
+    except pymysql.IntegrityError as e:
+        if is_slot_conflict(e):
+            raise SlotTakenError() from e
+        raise
+    return cursor.rowcount
+
+
+def book_slot(cursor, patient_id, doctor_id, appointment_date, appointment_time, appointment_type, cost,
+              status='Запланирован'):
+    execute_slot_statement(cursor, """
+        insert into appointment (patient_id, doctor_id, appointment_date, appointment_time,
+        appointment_type, status, cost)
+        values (%s, %s, %s, %s, %s, %s, %s)
+    """, (patient_id, doctor_id, appointment_date, appointment_time, appointment_type, status, cost))
+    return cursor.lastrowid
+
+
+def reschedule_slot(cursor, appointment_id, appointment_date, appointment_time):
+    return execute_slot_statement(cursor, """
+        update appointment
+        set appointment_date = %s, appointment_time = %s
+        where id = %s
+    """, (appointment_date, appointment_time, appointment_id))
+
+
+def set_status(cursor, appointment_id, status):
+    return execute_slot_statement(cursor, """
+        update appointment set status = %s where id = %s
+    """, (status, appointment_id))
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from config import CHANGE_FEED_CONFIG
+from appointment_changes import current_watermark, fetch_changes
+from query_executor import QueryExecutor
+
+
+class ChangeFeed(QObject):
+
+    changed = pyqtSignal(object)
+    overflow = pyqtSignal()
+
+    def __init__(self, patient_id=None, interval_ms=CHANGE_FEED_CONFIG['interval_ms'], parent=None):
+        super().__init__(parent)
+        self.patient_id = patient_id
+        self.watermark = None
+        self._seen = {}
+        self.executor = QueryExecutor(self, max_threads=1)
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.poll)
+
+    def start(self):
+        self.timer.start()
+        self.poll()
+
+    def stop(self):
+        self.timer.stop()
+
+    def poll(self):
+        if self.executor.is_busy():
+            return
+
+        since = self.watermark
+        patient_id = self.patient_id
+
+        def fetch(connection):
+            if since is None:
+                return current_watermark(connection), []
+            return fetch_changes(connection, since, patient_id)
+
+        self.executor.submit('change_feed', fetch, self.apply,
+                             lambda e: print(f"Ошибка получения изменений записей: {e}"))
+
+    def apply(self, result):
+        watermark, rows = result
+        self.watermark = watermark
+        if rows is None:
+            self._seen.clear()
+            self.overflow.emit()
+            return
+
+        changes = [row for row in rows if self._seen.get(row.id) != row.updated_at]
+        for row in changes:
+            self._seen[row.id] = row.updated_at
+
+        horizon = watermark - timedelta(seconds=CHANGE_FEED_CONFIG['overlap_seconds'])
+        self._seen = {row_id: updated_at for row_id, updated_at in self._seen.items() if updated_at > horizon}
+
+        if changes:
+            self.changed.emit(changes)
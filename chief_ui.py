@@ -1,38 +1,61 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QTabWidget, QTableWidget, QTableWidgetItem,
+                             QTableWidget, QTableWidgetItem,
                              QPushButton, QLabel, QDateEdit, QLineEdit, QGroupBox, QMessageBox)
-from PyQt6.QtCore import QDate
-import pymysql
-from config import DB_CONFIG
+from PyQt6.QtCore import QDate, QTimer
+from config import CHANGE_FEED_CONFIG
+from query_executor import QueryExecutor
+from rollup import rollup_statistics, doctors_workload
+from export import export_daily_report
+from export_dialog import start_export
+from lazy_tabs import LazyTabWidget
+from change_feed import ChangeFeed
 
 class ChiefWindow(QMainWindow):
 
-    def __init__(self, user_info):
+    def __init__(self, session):
         super().__init__()
-        self.user_info = user_info
-        self.setWindowTitle(f"Главный врач - {user_info['full_name']}")
+        self.session = session
+        self.setWindowTitle(f"Главный врач - {session.full_name}")
         self.setGeometry(100, 100, 1200, 700)
+        self.query_executor = QueryExecutor(self)
+        self.query_executor.busy_changed.connect(self.show_loading)
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
 
         layout = QVBoxLayout()
-        tabs = QTabWidget()
+        self.tabs = LazyTabWidget()
 
-        tabs.addTab(self.create_statistics_tab(), "Статистика")
-        tabs.addTab(self.create_attendance_tab(), "Процент явки")
-        tabs.addTab(self.create_average_check_tab(), "Средний чек")
+        self.statistics_tab_index = self.tabs.add_lazy_tab(self.create_statistics_tab, "Статистика")
+        self.tabs.add_lazy_tab(self.create_attendance_tab, "Процент явки")
+        self.tabs.add_lazy_tab(self.create_average_check_tab, "Средний чек")
 
-        layout.addWidget(tabs)
+        layout.addWidget(self.tabs)
         central_widget.setLayout(layout)
 
-    def get_connection(self):
-
-        try:
-            return pymysql.connect(**DB_CONFIG)
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {e}")
-            return None
+        self.statistics_stale = False
+        self.statistics_refresh_timer = QTimer(self)
+        self.statistics_refresh_timer.setSingleShot(True)
+        self.statistics_refresh_timer.setInterval(CHANGE_FEED_CONFIG['statistics_refresh_ms'])
+        self.statistics_refresh_timer.timeout.connect(self.refresh_statistics)
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+        self.change_feed = ChangeFeed(parent=self)
+        self.change_feed.changed.connect(self.schedule_statistics_refresh)
+        self.change_feed.overflow.connect(self.schedule_statistics_refresh)
+        self.change_feed.start()
+
+    def show_loading(self, busy):
+        if busy:
+            self.statusBar().showMessage("Загрузка данных...")
+        else:
+            self.statusBar().clearMessage()
+
+    def run_query(self, key, fetch, on_result, error_title):
+        self.query_executor.submit(
+            key, fetch, on_result,
+            lambda e: QMessageBox.critical(self, "Ошибка", f"{error_title}: {e}")
+        )
 
     def create_statistics_tab(self):
 
@@ -70,6 +93,10 @@ class ChiefWindow(QMainWindow):
         btn_refresh_doctors.clicked.connect(self.load_doctors_workload)
         doctors_layout.addWidget(btn_refresh_doctors)
 
+        btn_export = QPushButton("Экспорт отчёта по дням")
+        btn_export.clicked.connect(lambda: self.export_daily_report())
+        doctors_layout.addWidget(btn_export)
+
         doctors_group.setLayout(doctors_layout)
         layout.addWidget(doctors_group)
 
@@ -78,55 +105,56 @@ class ChiefWindow(QMainWindow):
         self.load_doctors_workload()
         return widget
 
-    def load_statistics(self):
+    def statistics_visible(self):
+
+        return (self.isVisible() and not self.isMinimized()
+                and self.tabs.currentIndex() == self.statistics_tab_index
+                and self.tabs.is_built(self.create_statistics_tab))
+
+    def schedule_statistics_refresh(self, changes=None):
+
+        self.statistics_stale = True
+        if not self.statistics_refresh_timer.isActive():
+            self.refresh_statistics()
+
+    def on_tab_changed(self, index):
 
-        connection = self.get_connection()
-        if not connection:
+        if index == self.statistics_tab_index and not self.statistics_refresh_timer.isActive():
+            self.refresh_statistics()
+
+    def refresh_statistics(self):
+
+        if not self.statistics_stale or not self.statistics_visible():
             return
+        self.statistics_stale = False
 
-        try:
-            cursor = connection.cursor()
+        def fetch(connection):
+            return rollup_statistics(connection)
 
-            cursor.execute("select count(*) from patient")
-            patients_count = cursor.fetchone()[0]
+        self.run_query('statistics', fetch, self.fill_statistics, "Ошибка загрузки статистики")
+        self.load_doctors_workload()
+        self.statistics_refresh_timer.start()
 
-            cursor.execute("select count(*) from appointment")
-            appointments_count = cursor.fetchone()[0]
+    def load_statistics(self):
 
-            cursor.execute("select count(*) from appointment where status = 'Завершён'")
-            completed_count = cursor.fetchone()[0]
+        def fetch(connection):
+            return rollup_statistics(connection, with_patients=True)
 
-            self.stats_patients_label.setText(f"Количество пациентов: {patients_count}")
-            self.stats_appointments_label.setText(f"Количество приёмов: {appointments_count}")
-            self.stats_completed_label.setText(f"Завершённых приёмов: {completed_count}")
+        self.run_query('statistics', fetch, self.fill_statistics, "Ошибка загрузки статистики")
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки статистики: {e}")
-            if connection:
-                connection.close()
+    def fill_statistics(self, stats):
 
-    def load_doctors_workload(self):
+        if 'patients' in stats:
+            self.stats_patients_label.setText(f"Количество пациентов: {stats['patients']}")
+        self.stats_appointments_label.setText(f"Количество приёмов: {stats['total']}")
+        self.stats_completed_label.setText(f"Завершённых приёмов: {stats['completed']}")
 
-        connection = self.get_connection()
-        if not connection:
-            return
+    def load_doctors_workload(self):
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                select d.full_name, s.name,
-                       count(a.id) as total_appointments,
-                       sum(case when a.status = 'Завершён' then 1 else 0 end) as completed
-                from doctor d
-                left join specialization s on d.specialization_id = s.id
-                left join appointment a on d.id = a.doctor_id
-                group by d.id, d.full_name, s.name
-                order by total_appointments desc
-            """)
-            doctors = cursor.fetchall()
+        def fetch(connection):
+            return doctors_workload(connection)
 
+        def fill(doctors):
             self.doctors_table.setRowCount(len(doctors))
             for row, (doctor_name, specialization, total, completed) in enumerate(doctors):
                 self.doctors_table.setItem(row, 0, QTableWidgetItem(doctor_name))
@@ -135,12 +163,15 @@ class ChiefWindow(QMainWindow):
                 self.doctors_table.setItem(row, 3, QTableWidgetItem(str(completed)))
 
             self.doctors_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки загруженности: {e}")
-            if connection:
-                connection.close()
+
+        self.run_query('doctors_workload', fetch, fill, "Ошибка загрузки загруженности")
+
+    def export_daily_report(self, date_from=None, date_to=None):
+
+        def job(connection, path, progress):
+            return export_daily_report(connection, path, date_from, date_to, progress)
+
+        start_export(self, self.query_executor, "Экспорт отчёта", job)
 
     def create_attendance_tab(self):
         widget = QWidget()
@@ -169,6 +200,13 @@ class ChiefWindow(QMainWindow):
         self.attendance_result.setStyleSheet("font-size: 16px; font-weight: bold;")
         form_layout.addWidget(self.attendance_result)
 
+        btn_export = QPushButton("Экспорт отчёта за период")
+        btn_export.clicked.connect(lambda: self.export_daily_report(
+            self.attendance_date_from.date().toPyDate(),
+            self.attendance_date_to.date().toPyDate()
+        ))
+        form_layout.addWidget(btn_export)
+
         form_group.setLayout(form_layout)
         layout.addWidget(form_group)
 
@@ -180,45 +218,20 @@ class ChiefWindow(QMainWindow):
         date_from = self.attendance_date_from.date().toPyDate()
         date_to = self.attendance_date_to.date().toPyDate()
 
-        connection = self.get_connection()
-        if not connection:
-            return
-
-        try:
-            cursor = connection.cursor()
-
-            cursor.execute("""
-                select count(*)
-                from appointment
-                where appointment_date between %s and %s
-                and status != 'Отменён'
-            """, (date_from, date_to))
-
-            total_scheduled = cursor.fetchone()[0]
-
-            cursor.execute("""
-                select count(*)
-                from appointment
-                where appointment_date between %s and %s
-                and status = 'Завершён'
-            """, (date_from, date_to))
-
-            completed = cursor.fetchone()[0]
+        def fetch(connection):
+            return rollup_statistics(connection, date_from, date_to)
 
+        def fill(stats):
+            total_scheduled = stats['scheduled']
+            completed = stats['completed']
             if total_scheduled > 0:
-                attendance_percent = (completed / total_scheduled) * 100
                 self.attendance_result.setText(
-                    f"Процент явки: {attendance_percent:.2f}% ({completed} из {total_scheduled})"
+                    f"Процент явки: {stats['attendance_percent']:.2f}% ({completed} из {total_scheduled})"
                 )
             else:
                 self.attendance_result.setText("Нет записей за выбранный период")
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка расчёта: {e}")
-            if connection:
-                connection.close()
+        self.run_query('attendance', fetch, fill, "Ошибка расчёта")
 
     def create_average_check_tab(self):
         widget = QWidget()
@@ -258,24 +271,13 @@ class ChiefWindow(QMainWindow):
         date_from = self.avg_check_date_from.date().toPyDate()
         date_to = self.avg_check_date_to.date().toPyDate()
 
-        connection = self.get_connection()
-        if not connection:
-            return
-
-        try:
-            cursor = connection.cursor()
-
-            cursor.execute("""
-                select avg(cost), count(*), sum(cost)
-                from appointment
-                where appointment_date between %s and %s
-                and status = 'Завершён'
-            """, (date_from, date_to))
+        def fetch(connection):
+            return rollup_statistics(connection, date_from, date_to)
 
-            result = cursor.fetchone()
-            avg_cost = result[0]
-            count = result[1]
-            total_cost = result[2]
+        def fill(stats):
+            avg_cost = stats['average_check']
+            count = stats['completed']
+            total_cost = stats['revenue']
 
             if avg_cost:
                 self.avg_check_result.setText(
@@ -284,9 +286,4 @@ class ChiefWindow(QMainWindow):
             else:
                 self.avg_check_result.setText("Нет завершённых приёмов за выбранный период")
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка расчёта: {e}")
-            if connection:
-                connection.close()
+        self.run_query('average_check', fetch, fill, "Ошибка расчёта")
@@ -0,0 +1,24 @@
+STATUSES = ['Запланирован', 'Пациент на приёме', 'Завершён', 'Не явился', 'Отменён']
+COMPLETED = 'Завершён'
+CANCELLED = 'Отменён'
+
+
+def build_statistics(total, status_counts, revenue, patients=None):
+    by_status = dict(zip(STATUSES, (int(count or 0) for count in status_counts)))
+    completed = by_status[COMPLETED]
+    scheduled = total - by_status[CANCELLED]
+    revenue = float(revenue or 0)
+
+    stats = {
+        'total': total,
+        'by_status': by_status,
+        'scheduled': scheduled,
+        'completed': completed,
+        'attendance_percent': completed / scheduled * 100 if scheduled else None,
+        'revenue': revenue,
+        'average_check': revenue / completed if completed else None
+    }
+    if patients is not None:
+        stats['patients'] = patients
+    return stats
+
@@ -6,3 +6,30 @@ DB_CONFIG = {
     'database': 'clinic_db',
     'charset': 'utf8mb4'
 }
+
+POOL_CONFIG = {
+    'max_size': 10,
+    'max_idle_time': 300,
+    'health_check_interval': 30,
+    'acquire_timeout': 10
+}
+
+REFERENCE_CACHE_TTL = 300
+
+QUERY_METRICS_CONFIG = {
+    'slow_query_ms': 200,
+    'window': 1000,
+    'slow_query_log': 'slow_queries.log',
+    'dump_on_exit': False
+}
+
+CHANGE_FEED_CONFIG = {
+    'interval_ms': 5000,
+    'overlap_seconds': 5,
+    'max_rows': 500,
+    'statistics_refresh_ms': 60000
+}
+
+STARTUP_TIMELINE_LOG = 'startup_timeline.log'
+
+SEED_TEST_DATA = False
@@ -0,0 +1,282 @@
+import argparse
+import itertools
+import random
+import time
+from array import array
+from datetime import date, timedelta
+
+import pymysql
+from clinic_stats import CANCELLED, COMPLETED
+from query_metrics import TimedSSCursor
+from rollup import TRIGGERS, ensure_rollup
+from schedule import SLOT_TIMES
+from sequences import reserve_medical_record_numbers
+
+BATCH_SIZE = 5000
+OCCUPANCY = 0.8
+
+SPECIALIZATIONS = [
+    'Терапевт', 'Кардиолог', 'Эндокринолог', 'Хирург', 'Невролог', 'Офтальмолог',
+    'Оториноларинголог', 'Дерматолог', 'Гастроэнтеролог', 'Уролог', 'Гинеколог',
+    'Травматолог-ортопед', 'Пульмонолог', 'Ревматолог', 'Аллерголог', 'Психотерапевт'
+]
+
+MALE_NAMES = ['Александр', 'Дмитрий', 'Максим', 'Сергей', 'Андрей', 'Алексей', 'Иван',
+              'Михаил', 'Николай', 'Евгений', 'Владимир', 'Павел', 'Артём', 'Олег']
+FEMALE_NAMES = ['Анна', 'Мария', 'Елена', 'Ольга', 'Татьяна', 'Наталья', 'Ирина',
+                'Светлана', 'Екатерина', 'Юлия', 'Марина', 'Дарья', 'Ксения', 'Галина']
+SURNAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов',
+            'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев',
+            'Семёнов', 'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов',
+            'Андреев', 'Макаров', 'Никитин', 'Захаров', 'Зайцев', 'Соловьёв', 'Борисов']
+PATRONYMICS = ['Александров', 'Дмитриев', 'Сергеев', 'Андреев', 'Алексеев', 'Иванов',
+               'Михайлов', 'Николаев', 'Владимиров', 'Павлов', 'Петров', 'Викторов']
+STREETS = ['Ленина', 'Пушкина', 'Гагарина', 'Мира', 'Советская', 'Садовая', 'Лесная',
+           'Школьная', 'Молодёжная', 'Центральная', 'Набережная', 'Заречная']
+INSURANCE_COMPANIES = ['СОГАЗ', 'АльфаСтрахование', 'Росгосстрах', 'Ингосстрах',
+                       'РЕСО-Гарантия', 'ВСК', 'Страховая Компания 1', 'Страховая Компания 2']
+
+APPOINTMENT_TYPES = [('Первичный', 0.45), ('Повторный', 0.4), ('Профилактический', 0.15)]
+PAST_STATUSES = [(COMPLETED, 0.8), ('Не явился', 0.07), (CANCELLED, 0.13)]
+FUTURE_STATUSES = [('Запланирован', 0.88), (CANCELLED, 0.12)]
+TODAY_STATUSES = [(COMPLETED, 0.4), ('Пациент на приёме', 0.1), ('Запланирован', 0.4), (CANCELLED, 0.1)]
+PAYMENT_METHODS = [('Наличные', 0.35), ('Карта', 0.65)]
+DMS_SHARE = 0.2
+BASE_COSTS = [1000.00, 1500.00, 2000.00, 2500.00]
+DIAGNOSES = [('ОРВИ', 'Постельный режим, обильное питьё'),
+             ('Гипертония', 'Контроль давления, препарат по схеме'),
+             ('Остеохондроз', 'ЛФК, физиотерапия'),
+             ('Гастрит', 'Диета, повторный осмотр через 2 недели'),
+             ('Здоров', None)]
+
+PATIENT_INSERT = """
+    insert into patient (medical_record_number, full_name, date_of_birth, gender, address,
+    phone, email, passport_series, passport_number, oms_policy, dms_policy, insurance_company, insurance_type)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+APPOINTMENT_INSERT = """
+    insert into appointment (patient_id, doctor_id, appointment_date, appointment_time,
+    appointment_type, status, cost, payment_method, diagnosis, prescription)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def weighted(rng, choices):
+    point = rng.random()
+    for value, weight in choices:
+        point -= weight
+        if point < 0:
+            return value
+    return choices[-1][0]
+
+
+def person_name(rng, gender):
+    surname = rng.choice(SURNAMES)
+    patronymic = rng.choice(PATRONYMICS)
+    if gender == 'Ж':
+        return f"{surname}а {rng.choice(FEMALE_NAMES)} {patronymic}на"
+    return f"{surname} {rng.choice(MALE_NAMES)} {patronymic}ич"
+
+
+def phone_number(rng):
+    return f"+7-9{rng.randint(0, 99):02d}-{rng.randint(0, 999):03d}-{rng.randint(0, 99):02d}-{rng.randint(0, 99):02d}"
+
+
+def digits(rng, count):
+    return str(rng.randrange(10 ** (count - 1), 10 ** count))
+
+
+def insert_batches(connection, query, rows, batch_size, label):
+    cursor = connection.cursor()
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(query, batch)
+            connection.commit()
+            total += len(batch)
+            batch = []
+            print(f"{label}: {total}", end='\r')
+    if batch:
+        cursor.executemany(query, batch)
+        connection.commit()
+        total += len(batch)
+    cursor.close()
+    print(f"{label}: {total}")
+    return total
+
+
+def load_ids(connection, table, after_id=0):
+    ids = array('l')
+    cursor = connection.cursor(TimedSSCursor)
+    cursor.execute(f"select id from {table} where id > %s order by id", (after_id,))
+    for (row_id,) in cursor:
+        ids.append(row_id)
+    cursor.close()
+    return ids
+
+
+def max_id(connection, table):
+    cursor = connection.cursor()
+    cursor.execute(f"select coalesce(max(id), 0) from {table}")
+    value = cursor.fetchone()[0]
+    cursor.close()
+    return value
+
+
+def generate_specializations(connection):
+    cursor = connection.cursor()
+    cursor.executemany("insert ignore into specialization (name) values (%s)",
+                       [(name,) for name in SPECIALIZATIONS])
+    connection.commit()
+    cursor.close()
+    return load_ids(connection, 'specialization')
+
+
+def generate_doctors(connection, rng, count, specialization_ids):
+    first_id = max_id(connection, 'doctor')
+
+    def rows():
+        for number in range(count):
+            gender = rng.choice(('М', 'Ж'))
+            yield (person_name(rng, gender), rng.choice(specialization_ids), phone_number(rng),
+                   f"doctor{first_id + number + 1}@clinic.ru")
+
+    insert_batches(connection, """
+        insert into doctor (full_name, specialization_id, phone, email)
+        values (%s, %s, %s, %s)
+    """, rows(), BATCH_SIZE, "Врачи")
+    return load_ids(connection, 'doctor', first_id)
+
+
+def generate_patients(connection, rng, count, batch_size):
+    first_id = max_id(connection, 'patient')
+    numbers = reserve_medical_record_numbers(connection, count) if count else []
+    start = date(1930, 1, 1).toordinal()
+    end = date(2024, 12, 31).toordinal()
+
+    def rows():
+        for number in numbers:
+            gender = rng.choice(('М', 'Ж'))
+            dms = rng.random() < DMS_SHARE
+            policy = digits(rng, 16)
+            yield (
+                number, person_name(rng, gender), date.fromordinal(rng.randint(start, end)), gender,
+                f"г. Москва, ул. {rng.choice(STREETS)}, д. {rng.randint(1, 150)}",
+                phone_number(rng), f"{number.lower().replace('-', '')}@mail.ru",
+                digits(rng, 4), digits(rng, 6),
+                None if dms else policy, policy if dms else None,
+                rng.choice(INSURANCE_COMPANIES), 'ДМС' if dms else 'ОМС'
+            )
+
+    insert_batches(connection, PATIENT_INSERT, rows(), batch_size, "Пациенты")
+    return load_ids(connection, 'patient', first_id)
+
+
+def first_appointment_day(count, doctors, anchor):
+    slots_per_day = max(1, int(doctors * len(SLOT_TIMES) * OCCUPANCY))
+    days = max(1, -(-count // slots_per_day))
+    future_days = min(30, days // 10)
+    return anchor - timedelta(days=days - future_days - 1)
+
+
+def generate_appointments(connection, rng, count, doctor_ids, patient_ids, anchor, batch_size):
+    first_day = first_appointment_day(count, len(doctor_ids), anchor)
+
+    def rows():
+        remaining = count
+        for offset in itertools.count():
+            day = first_day + timedelta(days=offset)
+            if day < anchor:
+                statuses = PAST_STATUSES
+            elif day > anchor:
+                statuses = FUTURE_STATUSES
+            else:
+                statuses = TODAY_STATUSES
+            for doctor_id in doctor_ids:
+                for slot in SLOT_TIMES:
+                    if remaining == 0:
+                        return
+                    if rng.random() >= OCCUPANCY:
+                        continue
+                    remaining -= 1
+                    status = weighted(rng, statuses)
+                    cost = rng.choice(BASE_COSTS)
+                    payment_method = diagnosis = prescription = None
+                    if status == COMPLETED:
+                        payment_method = weighted(rng, PAYMENT_METHODS) if rng.random() < 0.9 else None
+                        diagnosis, prescription = rng.choice(DIAGNOSES)
+                    yield (rng.choice(patient_ids), doctor_id, day, slot, weighted(rng, APPOINTMENT_TYPES),
+                           status, cost, payment_method, diagnosis, prescription)
+
+    cursor = connection.cursor()
+    for name in TRIGGERS:
+        cursor.execute(f"drop trigger if exists {name}")
+    cursor.close()
+
+    try:
+        insert_batches(connection, APPOINTMENT_INSERT, rows(), batch_size, "Записи")
+    finally:
+        cursor = connection.cursor()
+        rollup_rows = ensure_rollup(cursor)
+        connection.commit()
+        cursor.close()
+        print(f"Сводная таблица: {rollup_rows} строк")
+
+
+def generate(connection, doctors, patients, appointments, seed, anchor, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    cursor = connection.cursor()
+    cursor.execute("set session foreign_key_checks = 0")
+    cursor.close()
+
+    try:
+        specialization_ids = generate_specializations(connection)
+        doctor_ids = generate_doctors(connection, rng, doctors, specialization_ids)
+        patient_ids = generate_patients(connection, rng, patients, batch_size)
+        if appointments and doctor_ids and patient_ids:
+            generate_appointments(connection, rng, appointments, doctor_ids, patient_ids, anchor, batch_size)
+    finally:
+        cursor = connection.cursor()
+        cursor.execute("set session foreign_key_checks = 1")
+        cursor.close()
+
+
+def main(argv=None):
+    from db import get_connection, init_database
+
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных клиники")
+    parser.add_argument('--doctors', type=int, default=300)
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--appointments', type=int, default=20000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--anchor-date', type=date.fromisoformat, default=date.today(),
+                        help="дата, относительно которой записи делятся на прошедшие и будущие")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if not init_database():
+        return 1
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    started = time.perf_counter()
+    try:
+        generate(connection, args.doctors, args.patients, args.appointments,
+                 args.seed, args.anchor_date, args.batch_size)
+    except pymysql.Error as e:
+        print(f"Ошибка генерации данных: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,11 +1,211 @@
+import threading
+import time
+import weakref
+from collections import deque
+
 import pymysql
-from config import DB_CONFIG
+from pymysql.constants import ER
+from config import DB_CONFIG, POOL_CONFIG, SEED_TEST_DATA
+from sequences import MEDICAL_RECORD_SEQUENCE
+from migrations import migrate
+from indexes import DuplicateRowsError
+from query_metrics import TimedCursor
+
+
+class PooledConnection:
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+        self._finalizer = weakref.finalize(self, pool.discard, raw, True)
+
+    def __getattr__(self, name):
+        if self._released:
+            raise pymysql.err.InterfaceError(0, "Соединение уже возвращено в пул")
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._finalizer.detach()
+        self._pool.release(self._raw)
+
+    def discard(self):
+        if self._released:
+            return
+        self._released = True
+        self._finalizer.detach()
+        self._pool.discard(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+
+    def __init__(self, config, max_size=10, max_idle_time=300, health_check_interval=30, acquire_timeout=10):
+        self.config = config
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = deque()
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'evicted': 0,
+            'failed_health_checks': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'leaked': 0
+        }
+
+    def acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._condition:
+            if self._closed:
+                raise pymysql.err.InterfaceError(0, "Пул соединений закрыт")
+
+            self._evict_idle()
+            while True:
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                    break
+                if self._in_use < self.max_size:
+                    raw, last_used = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise pymysql.err.OperationalError(0, "Превышено время ожидания свободного соединения")
+                self._stats['waits'] += 1
+                self._condition.wait(remaining)
+
+            self._in_use += 1
+
+        try:
+            if raw is not None and time.monotonic() - last_used > self.health_check_interval:
+                try:
+                    raw.ping(reconnect=False)
+                except pymysql.Error:
+                    self._close_raw(raw)
+                    raw = None
+                    with self._condition:
+                        self._stats['failed_health_checks'] += 1
+
+            if raw is None:
+                raw = pymysql.connect(**self.config)
+                counter = 'created'
+            else:
+                counter = 'reused'
+
+            with self._condition:
+                self._stats[counter] += 1
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        if raw.open:
+            try:
+                raw.rollback()
+            except pymysql.Error:
+                self._close_raw(raw)
+
+        with self._condition:
+            self._in_use -= 1
+            if raw.open and not self._closed:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._close_raw(raw)
+            self._condition.notify()
+
+    def discard(self, raw, leaked=False):
+        self._close_raw(raw)
+        with self._condition:
+            self._in_use -= 1
+            if leaked:
+                self._stats['leaked'] += 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            result = dict(self._stats)
+            result['idle'] = len(self._idle)
+            result['in_use'] = self._in_use
+            result['max_size'] = self.max_size
+            return result
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.popleft()
+                self._close_raw(raw)
+            self._condition.notify_all()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle_time:
+            raw, _ = self._idle.popleft()
+            self._close_raw(raw)
+            self._stats['evicted'] += 1
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except pymysql.Error:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(dict(DB_CONFIG, cursorclass=TimedCursor), **POOL_CONFIG)
+        return _pool
+
+
+def pooled_connection():
+    return get_pool().acquire()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
 
 
 def get_connection():
     try:
-        connection = pymysql.connect(**DB_CONFIG)
-        return connection
+        return pooled_connection()
     except pymysql.Error as e:
         print(f"Ошибка подключения к БД: {e}")
         return None
@@ -15,7 +215,7 @@ def create_database():
     try:
         config = DB_CONFIG.copy()
         database = config.pop('database')
-        connection = pymysql.connect(**config)
+        connection = pymysql.connect(**config, cursorclass=TimedCursor)
         cursor = connection.cursor()
         cursor.execute(f"create database if not exists {database} character set utf8mb4 collate utf8mb4_unicode_ci")
         connection.commit()
@@ -25,93 +225,6 @@ def create_database():
         print(f"Ошибка создания БД: {e}")
 
 
-def run_migrations():
-    connection = get_connection()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        cursor.execute("""
-            create table if not exists app_user (
-                id int auto_increment primary key,
-                login varchar(50) unique not null,
-                password varchar(100) not null,
-                role enum('ADMIN', 'CHIEF', 'PATIENT') not null,
-                full_name varchar(200) not null,
-                created_at timestamp default current_timestamp
-            ) engine=InnoDB default charset=utf8mb4
-        """)
-        
-        cursor.execute("""
-            create table if not exists specialization (
-                id int auto_increment primary key,
-                name varchar(100) not null unique
-            ) engine=InnoDB default charset=utf8mb4
-        """)
-        
-        cursor.execute("""
-            create table if not exists doctor (
-                id int auto_increment primary key,
-                full_name varchar(200) not null,
-                specialization_id int not null,
-                phone varchar(20),
-                email varchar(100),
-                foreign key (specialization_id) references specialization(id) on delete cascade
-            ) engine=InnoDB default charset=utf8mb4
-        """)
-        
-        cursor.execute("""
-            create table if not exists patient (
-                id int auto_increment primary key,
-                medical_record_number varchar(50) unique not null,
-                full_name varchar(200) not null,
-                date_of_birth date not null,
-                gender enum('М', 'Ж') not null,
-                address text,
-                phone varchar(20),
-                email varchar(100),
-                passport_series varchar(10),
-                passport_number varchar(20),
-                oms_policy varchar(50),
-                dms_policy varchar(50),
-                insurance_company varchar(200),
-                insurance_type enum('ОМС', 'ДМС') default 'ОМС',
-                created_at timestamp default current_timestamp
-            ) engine=InnoDB default charset=utf8mb4
-        """)
-        
-        cursor.execute("""
-            create table if not exists appointment (
-                id int auto_increment primary key,
-                patient_id int not null,
-                doctor_id int not null,
-                appointment_date date not null,
-                appointment_time time not null,
-                appointment_type enum('Первичный', 'Повторный', 'Профилактический') not null,
-                status enum('Запланирован', 'Пациент на приёме', 'Завершён', 'Не явился', 'Отменён') default 'Запланирован',
-                cost decimal(10, 2) default 0.00,
-                payment_method enum('Наличные', 'Карта', 'По полису') null,
-                diagnosis text,
-                prescription text,
-                created_at timestamp default current_timestamp,
-                foreign key (patient_id) references patient(id) on delete cascade,
-                foreign key (doctor_id) references doctor(id) on delete cascade
-            ) engine=InnoDB default charset=utf8mb4
-        """)
-        
-        connection.commit()
-        cursor.close()
-        connection.close()
-        return True
-    except pymysql.Error as e:
-        print(f"Ошибка выполнения миграций: {e}")
-        if connection:
-            connection.close()
-        return False
-
-
 def insert_test_data():
     connection = get_connection()
     if not connection:
@@ -175,6 +288,15 @@ def insert_test_data():
             phone, email, passport_series, passport_number, oms_policy, dms_policy, insurance_company, insurance_type) 
             values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """, patients)
+        cursor.execute("""
+            update sequence_counter set value = greatest(value, %s) where name = %s
+        """, (len(patients), MEDICAL_RECORD_SEQUENCE))
+        cursor.executemany("""
+            update app_user u
+            join patient p on p.medical_record_number = %s
+            set u.patient_id = p.id
+            where u.login = %s
+        """, [('MR-001', 'patient1'), ('MR-002', 'patient2')])
         
         from datetime import date, time, timedelta
         today = date.today()
@@ -205,9 +327,33 @@ def insert_test_data():
         return False
 
 
-def init_database():
+def connect_or_create_database():
+    try:
+        return pooled_connection()
+    except pymysql.Error as e:
+        if not e.args or e.args[0] != ER.BAD_DB_ERROR:
+            print(f"Ошибка подключения к БД: {e}")
+            return None
     create_database()
-    if run_migrations():
-        insert_test_data()
-        return True
-    return False
+    return get_connection()
+
+
+def init_database(seed_test_data=SEED_TEST_DATA, report=print):
+    connection = connect_or_create_database()
+    if not connection:
+        return False
+
+    try:
+        migrate(connection)
+    except DuplicateRowsError as e:
+        report(e.args[1])
+        return False
+    except pymysql.Error as e:
+        report(f"Ошибка выполнения миграций: {e}")
+        return False
+    finally:
+        connection.close()
+
+    if seed_test_data:
+        return insert_test_data()
+    return True
@@ -0,0 +1,168 @@
+import argparse
+import csv
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pymysql
+from pagination import APPOINTMENT_COLUMNS, appointment_filter_clause
+from query_metrics import TimedSSCursor
+
+FETCH_SIZE = 5000
+FORMATS = ('csv', 'jsonl')
+
+APPOINTMENT_EXPORT_COLUMNS = [
+    ('id', "ID"), ('patient', "Пациент"), ('doctor', "Врач"), ('date', "Дата"),
+    ('time', "Время"), ('type', "Тип"), ('status', "Статус"), ('cost', "Стоимость")
+]
+
+DAILY_REPORT_COLUMNS = [
+    ('date', "Дата"), ('doctor', "Врач"), ('specialization', "Специализация"),
+    ('status', "Статус"), ('appointments', "Записей"), ('cost_sum', "Сумма"),
+    ('paid_appointments', "Оплачено записей"), ('paid_sum', "Оплачено")
+]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def export_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return 'jsonl' if extension in ('jsonl', 'json', 'ndjson') else 'csv'
+
+
+def export_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def stream_rows(connection, query, params=(), fetch_size=FETCH_SIZE):
+    cursor = connection.cursor(TimedSSCursor)
+    exhausted = False
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                exhausted = True
+                break
+            yield rows
+    finally:
+        if exhausted:
+            cursor.close()
+        else:
+            connection.discard()
+
+
+def write_csv(output, columns, batches, progress):
+    writer = csv.writer(output, delimiter=';')
+    writer.writerow([header for _, header in columns])
+    count = 0
+    for rows in batches:
+        writer.writerows([export_value(value) for value in row] for row in rows)
+        count += len(rows)
+        progress(count)
+    return count
+
+
+def write_jsonl(output, columns, batches, progress):
+    keys = [key for key, _ in columns]
+    count = 0
+    for rows in batches:
+        output.writelines(
+            json.dumps(dict(zip(keys, map(export_value, row))), ensure_ascii=False) + "\n"
+            for row in rows
+        )
+        count += len(rows)
+        progress(count)
+    return count
+
+
+def export_query(connection, path, columns, query, params=(), progress=None):
+    writer = write_jsonl if export_format(path) == 'jsonl' else write_csv
+    temp_path = path + '.part'
+    batches = stream_rows(connection, query, params)
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig' if writer is write_csv else 'utf-8') as output:
+            count = writer(output, columns, batches, progress or (lambda count: None))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        batches.close()
+    return count
+
+
+def export_appointments(connection, path, filters=None, progress=None):
+    conditions, params = appointment_filter_clause(filters or {})
+    query = APPOINTMENT_COLUMNS
+    if conditions:
+        query += " where " + " and ".join(conditions)
+    query += " order by a.appointment_date desc, a.appointment_time desc, a.id desc"
+    return export_query(connection, path, APPOINTMENT_EXPORT_COLUMNS, query, params, progress)
+
+
+def export_daily_report(connection, path, date_from=None, date_to=None, progress=None):
+    query = """
+        select r.stat_date, d.full_name, s.name, r.status, r.appointments, r.cost_sum,
+        r.paid_appointments, r.paid_sum
+        from appointment_daily_stats r
+        join doctor d on r.doctor_id = d.id
+        left join specialization s on d.specialization_id = s.id
+        where r.appointments <> 0
+    """
+    params = []
+    if date_from and date_to:
+        query += " and r.stat_date between %s and %s"
+        params.extend([date_from, date_to])
+    query += " order by r.stat_date, d.full_name, r.status"
+    return export_query(connection, path, DAILY_REPORT_COLUMNS, query, params, progress)
+
+
+def main(argv=None):
+    from db import get_connection
+
+    parser = argparse.ArgumentParser(description="Экспорт записей и отчётов в CSV или JSON Lines")
+    parser.add_argument('report', choices=['appointments', 'daily'])
+    parser.add_argument('path')
+    parser.add_argument('--date-from')
+    parser.add_argument('--date-to')
+    parser.add_argument('--doctor-id', type=int)
+    parser.add_argument('--status')
+    args = parser.parse_args(argv)
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    progress = lambda count: print(f"Выгружено строк: {count}", end='\r')
+    try:
+        if args.report == 'appointments':
+            count = export_appointments(connection, args.path, {
+                'date_from': args.date_from, 'date_to': args.date_to,
+                'doctor_id': args.doctor_id, 'status': args.status
+            }, progress)
+        else:
+            count = export_daily_report(connection, args.path, args.date_from, args.date_to, progress)
+    except (OSError, pymysql.Error) as e:
+        print(f"Ошибка экспорта: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    print(f"Выгружено строк: {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+import os
+import threading
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from export import ExportCancelled
+
+FILE_FILTERS = "CSV (*.csv);;JSON Lines (*.jsonl)"
+
+
+def choose_export_path(parent, title):
+    path, selected_filter = QFileDialog.getSaveFileName(parent, title, "", FILE_FILTERS)
+    if path and not os.path.splitext(path)[1]:
+        path += '.jsonl' if selected_filter.startswith("JSON") else '.csv'
+    return path
+
+
+def start_export(parent, executor, title, job):
+    path = choose_export_path(parent, title)
+    if not path:
+        return
+
+    cancelled = threading.Event()
+    dialog = QProgressDialog("Подготовка экспорта...", "Отмена", 0, 0, parent)
+    dialog.setWindowTitle(title)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(0)
+    dialog.canceled.connect(cancelled.set)
+
+    def fetch(connection, report):
+        def progress(count):
+            if cancelled.is_set():
+                raise ExportCancelled()
+            report(count)
+
+        return job(connection, path, progress)
+
+    def done(count):
+        dialog.reset()
+        QMessageBox.information(parent, title, f"Выгружено строк: {count}\n{path}")
+
+    def failed(error):
+        dialog.reset()
+        if not isinstance(error, ExportCancelled):
+            QMessageBox.critical(parent, "Ошибка", f"Ошибка экспорта: {error}")
+
+    executor.submit('export', fetch, done, failed,
+                    lambda count: dialog.setLabelText(f"Выгружено строк: {count}"))
+    dialog.show()
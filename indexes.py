@@ -0,0 +1,215 @@
+from datetime import date, timedelta
+
+import pymysql
+from pymysql.constants import ER
+
+MAX_DUPLICATES_SHOWN = 20
+
+SLOT_INDEXES = [
+    ('appointment', 'uq_appointment_active_slot', 'doctor_id, appointment_date, appointment_time, active_slot', True),
+]
+
+HOT_PATH_INDEXES = SLOT_INDEXES + [
+    ('appointment', 'idx_appointment_date_time', 'appointment_date, appointment_time', False),
+    ('appointment', 'idx_appointment_status_date', 'status, appointment_date, appointment_time', False),
+    ('appointment', 'idx_appointment_date_status_cost', 'appointment_date, status, cost', False),
+    ('appointment', 'idx_appointment_patient_date', 'patient_id, appointment_date, appointment_time', False),
+    ('patient', 'idx_patient_full_name', 'full_name', False),
+    ('patient', 'idx_patient_phone', 'phone', False),
+    ('patient', 'idx_patient_oms_policy', 'oms_policy', False),
+    ('patient', 'idx_patient_dms_policy', 'dms_policy', False),
+]
+
+PAYMENT_QUEUE_INDEXES = [
+    ('appointment', 'idx_appointment_unpaid', 'appointment_date, payment_method, appointment_time', False),
+]
+
+INDEXES = HOT_PATH_INDEXES + PAYMENT_QUEUE_INDEXES
+
+
+class DuplicateRowsError(pymysql.IntegrityError):
+    pass
+
+
+def duplicate_rows(cursor, table, columns, limit=MAX_DUPLICATES_SHOWN):
+    not_null = " and ".join(f"{column.strip()} is not null" for column in columns.split(','))
+    query = f"""
+        select {columns}, group_concat(id order by id) from {table}
+        where {not_null}
+        group by {columns}
+        having count(*) > 1
+    """
+    if limit:
+        query += f" limit {int(limit)}"
+    cursor.execute(query)
+    return cursor.fetchall()
+
+
+def describe_duplicates(cursor, table, name, columns, limit=MAX_DUPLICATES_SHOWN):
+    lines = [f"Не удалось создать уникальный индекс {name}: в таблице {table} есть дубликаты ({columns})."]
+    for row in duplicate_rows(cursor, table, columns, limit):
+        lines.append(f"  {', '.join(str(value) for value in row[:-1])}: id {row[-1]}")
+    lines.append("Отмените или перенесите повторяющиеся записи и запустите приложение снова. "
+                 "Полный список: python indexes.py --duplicates")
+    return "\n".join(lines)
+
+
+def existing_indexes(cursor, table):
+    cursor.execute("""
+        select distinct index_name from information_schema.statistics
+        where table_schema = database() and table_name = %s
+    """, (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_indexes(cursor, indexes=INDEXES):
+    created = []
+    known = {}
+    for table, name, columns, unique in indexes:
+        if table not in known:
+            known[table] = existing_indexes(cursor, table)
+        if name in known[table]:
+            continue
+        try:
+            cursor.execute(f"create {'unique ' if unique else ''}index {name} on {table} ({columns})")
+        except pymysql.IntegrityError as e:
+            message = describe_duplicates(cursor, table, name, columns)
+            print(message)
+            raise DuplicateRowsError(ER.DUP_ENTRY, message) from e
+        known[table].add(name)
+        created.append(name)
+    return created
+
+
+def hot_queries():
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    return [
+        ("Проверка занятости слота", """
+            select id from appointment
+            where doctor_id = %s and appointment_date = %s and appointment_time = %s
+            and status not in ('Отменён', 'Не явился')
+        """, (1, today, '10:00:00'), {'uq_appointment_active_slot'}),
+        ("Расписание врача на неделю", """
+            select appointment_date, count(*) from appointment
+            where doctor_id = %s and appointment_date between %s and %s and active_slot = 1
+            group by appointment_date
+        """, (1, today, today + timedelta(days=6)), {'uq_appointment_active_slot'}),
+        ("Список записей (первая страница)", """
+            select a.id from appointment a
+            order by a.appointment_date desc, a.appointment_time desc, a.id desc
+            limit 201
+        """, (), {'idx_appointment_date_time'}),
+        ("Список записей (следующая страница)", """
+            select a.id from appointment a
+            where a.appointment_date <= %s and (a.appointment_date < %s or
+            (a.appointment_date = %s and (a.appointment_time < %s or
+            (a.appointment_time = %s and a.id < %s))))
+            order by a.appointment_date desc, a.appointment_time desc, a.id desc
+            limit 201
+        """, (month_ago, month_ago, month_ago, '12:00:00', '12:00:00', 1000000), {'idx_appointment_date_time'}),
+        ("Фильтр записей по статусу", """
+            select a.id from appointment a
+            where a.appointment_date >= %s and a.appointment_date <= %s and a.status = %s
+            order by a.appointment_date desc, a.appointment_time desc, a.id desc
+            limit 201
+        """, (month_ago, today, 'Запланирован'), {'idx_appointment_status_date', 'idx_appointment_date_status_cost'}),
+        ("Отчёты главного врача", """
+            select count(*), sum(cost) from appointment
+            where appointment_date between %s and %s and status = 'Завершён'
+        """, (month_ago, today), {'idx_appointment_date_status_cost', 'idx_appointment_status_date'}),
+        ("Записи пациента", """
+            select id from appointment
+            where patient_id = %s
+            order by appointment_date desc, appointment_time desc
+        """, (1,), {'idx_appointment_patient_date'}),
+        ("Очередь оплаты за день", """
+            select id from appointment
+            where payment_method is null and appointment_date = %s
+            and status in ('Завершён', 'Запланирован', 'Пациент на приёме')
+            order by appointment_date, appointment_time, id
+            limit 101
+        """, (today,), {'idx_appointment_unpaid'}),
+        ("Поиск пациента по ФИО", """
+            select id from patient where full_name = %s
+        """, ('Иванов Иван Иванович',), {'idx_patient_full_name'}),
+        ("Поиск пациента по телефону", """
+            select id from patient where phone like %s order by phone limit 20
+        """, ('+7-900%',), {'idx_patient_phone'}),
+    ]
+
+
+def explain(cursor, query, params=()):
+    cursor.execute("explain " + query, params)
+    columns = [column[0].lower() for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def check_index_usage(connection):
+    cursor = connection.cursor()
+    report = []
+    for title, query, params, expected in hot_queries():
+        plan = explain(cursor, query, params)
+        used = {row.get('key') for row in plan if row.get('key')}
+        report.append({
+            'query': title,
+            'keys': sorted(used),
+            'rows': sum(int(row.get('rows') or 0) for row in plan),
+            'extra': "; ".join(row.get('extra') or "" for row in plan),
+            'ok': bool(used & expected)
+        })
+    cursor.close()
+    return report
+
+
+def print_duplicates(connection):
+    cursor = connection.cursor()
+    found = False
+    for table, name, columns, unique in INDEXES:
+        if not unique:
+            continue
+        rows = duplicate_rows(cursor, table, columns, limit=None)
+        if not rows:
+            continue
+        found = True
+        print(f"{name} ({columns}):")
+        for row in rows:
+            print(f"  {', '.join(str(value) for value in row[:-1])}: id {row[-1]}")
+    cursor.close()
+    if not found:
+        print("Дубликатов не найдено")
+    return found
+
+
+def main(argv=None):
+    import argparse
+    from db import get_connection
+
+    parser = argparse.ArgumentParser(description="Проверка использования индексов")
+    parser.add_argument('--duplicates', action='store_true',
+                        help="показать записи, мешающие создать уникальные индексы")
+    args = parser.parse_args(argv)
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    if args.duplicates:
+        try:
+            found = print_duplicates(connection)
+        finally:
+            connection.close()
+        return 1 if found else 0
+
+    report = check_index_usage(connection)
+    connection.close()
+
+    for item in report:
+        status = "OK" if item['ok'] else "НЕ ИСПОЛЬЗУЕТСЯ"
+        print(f"[{status}] {item['query']}: key={', '.join(item['keys']) or '-'} "
+              f"rows={item['rows']} {item['extra']}")
+    return 0 if all(item['ok'] for item in report) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
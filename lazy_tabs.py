@@ -0,0 +1,48 @@
+from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtWidgets import QLabel, QTabWidget, QVBoxLayout, QWidget
+
+LOADING_TEXT = "Загрузка..."
+
+
+class LazyTabWidget(QTabWidget):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._factories = {}
+        self._shown = False
+        self.currentChanged.connect(self._on_current_changed)
+
+    def add_lazy_tab(self, factory, title):
+        placeholder = QWidget()
+        layout = QVBoxLayout(placeholder)
+        layout.setContentsMargins(0, 0, 0, 0)
+        label = QLabel(LOADING_TEXT)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(label)
+
+        self._factories[placeholder] = (factory, label)
+        return self.addTab(placeholder, title)
+
+    def is_built(self, factory):
+        return all(entry[0] != factory for entry in self._factories.values())
+
+    def ensure_built(self, index=None):
+        placeholder = self.widget(self.currentIndex() if index is None else index)
+        entry = self._factories.pop(placeholder, None)
+        if entry is None:
+            return
+
+        factory, label = entry
+        content = factory()
+        label.deleteLater()
+        placeholder.layout().addWidget(content)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._shown:
+            self._shown = True
+            QTimer.singleShot(0, self.ensure_built)
+
+    def _on_current_changed(self, index):
+        if self._shown:
+            self.ensure_built(index)
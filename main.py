@@ -1,79 +1,161 @@
+import time
+
+_started = time.perf_counter()
+
+import importlib
 import sys
+import threading
+from startup_timeline import StartupTimeline, watch_first_paint
 from PyQt6.QtWidgets import QApplication
-from db import init_database
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from db import init_database, close_pool
+from config import QUERY_METRICS_CONFIG
+from query_metrics import dump_summary
 from auth import authenticate
-from admin_ui import AdminWindow
-from chief_ui import ChiefWindow
-from patient_ui import PatientWindow
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox
+from PyQt6.QtGui import QKeySequence, QShortcut
+
+ROLE_WINDOWS = {
+    'ADMIN': ('admin_ui', 'AdminWindow'),
+    'CHIEF': ('chief_ui', 'ChiefWindow'),
+    'PATIENT': ('patient_ui', 'PatientWindow'),
+}
+
+timeline = StartupTimeline(_started)
+timeline.mark("импорт модулей")
+
+
+class DatabaseInitializer(QObject):
+
+    finished = pyqtSignal(bool, str)
+
+    def start(self):
+        timeline.mark("инициализация БД начата")
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        errors = []
+
+        def report(message):
+            print(message)
+            errors.append(message)
+
+        result = init_database(report=report)
+        timeline.mark("инициализация БД завершена")
+        self.finished.emit(result, "\n".join(errors))
 
 
 class LoginDialog(QDialog):
-    
-    def __init__(self):
+
+    def __init__(self, db_initializer):
         super().__init__()
         self.setWindowTitle("Авторизация")
-        self.setFixedSize(300, 150)
-        self.user_info = None
-        
+        self.setFixedSize(300, 170)
+        self.session = None
+        self.db_ready = None
+        self.pending_login = False
+        db_initializer.finished.connect(self.on_database_ready)
+
         layout = QVBoxLayout()
-        
+
         self.login_edit = QLineEdit()
         self.login_edit.setPlaceholderText("Логин")
         layout.addWidget(self.login_edit)
-        
+
         self.password_edit = QLineEdit()
         self.password_edit.setPlaceholderText("Пароль")
         self.password_edit.setEchoMode(QLineEdit.EchoMode.Password)
         layout.addWidget(self.password_edit)
-        
-        login_btn = QPushButton("Войти")
-        login_btn.clicked.connect(self.login)
-        layout.addWidget(login_btn)
-        
+
+        self.login_btn = QPushButton("Войти")
+        self.login_btn.clicked.connect(self.login)
+        layout.addWidget(self.login_btn)
+
+        self.status_label = QLabel("Подключение к базе данных...")
+        layout.addWidget(self.status_label)
+
         self.setLayout(layout)
-    
+
+    def on_database_ready(self, ok, error):
+        self.db_ready = ok
+        if not ok:
+            message = "Не удалось инициализировать базу данных"
+            QMessageBox.critical(self, "Ошибка", f"{message}\n\n{error}" if error else message)
+            self.reject()
+            return
+
+        self.status_label.hide()
+        if self.pending_login:
+            self.pending_login = False
+            self.login_btn.setEnabled(True)
+            self.login()
+
     def login(self):
         login = self.login_edit.text()
         password = self.password_edit.text()
-        
+
         if not login or not password:
             QMessageBox.warning(self, "Ошибка", "Введите логин и пароль")
             return
-        
-        user_info = authenticate(login, password)
-        if user_info:
-            self.user_info = user_info
+
+        if self.db_ready is None:
+            self.pending_login = True
+            self.login_btn.setEnabled(False)
+            self.status_label.setText("Вход будет выполнен после подключения к базе данных...")
+            return
+
+        session = authenticate(login, password)
+        if session:
+            self.session = session
             self.accept()
         else:
             QMessageBox.warning(self, "Ошибка", "Неверный логин или пароль")
 
 
+def create_role_window(session):
+    module_name, class_name = ROLE_WINDOWS[session.role]
+    window_class = getattr(importlib.import_module(module_name), class_name)
+    timeline.mark(f"импорт {module_name}")
+    return window_class(session)
+
+
+def on_first_paint():
+    timeline.mark("первая отрисовка окна")
+    try:
+        timeline.write_log()
+    except OSError as e:
+        print(f"Не удалось записать журнал запуска: {e}")
+
+
 def main():
     app = QApplication(sys.argv)
-    
-    if not init_database():
-        QMessageBox.critical(None, "Ошибка", "Не удалось инициализировать базу данных")
-        sys.exit(1)
-    
-    login_dialog = LoginDialog()
+    app.aboutToQuit.connect(close_pool)
+    if QUERY_METRICS_CONFIG.get('dump_on_exit'):
+        app.aboutToQuit.connect(dump_summary)
+    timeline.mark("QApplication создан")
+
+    db_initializer = DatabaseInitializer()
+    login_dialog = LoginDialog(db_initializer)
+    db_initializer.start()
+
+    QTimer.singleShot(0, lambda: timeline.mark("окно входа показано"))
     if login_dialog.exec() != QDialog.DialogCode.Accepted:
+        sys.exit(1 if login_dialog.db_ready is False else 0)
+
+    session = login_dialog.session
+    if not session:
         sys.exit(0)
-    
-    user_info = login_dialog.user_info
-    if not user_info:
-        sys.exit(0)
-    
-    if user_info['role'] == 'ADMIN':
-        window = AdminWindow(user_info)
-    elif user_info['role'] == 'CHIEF':
-        window = ChiefWindow(user_info)
-    elif user_info['role'] == 'PATIENT':
-        window = PatientWindow(user_info)
-    else:
+    timeline.mark("вход выполнен")
+
+    if session.role not in ROLE_WINDOWS:
         QMessageBox.critical(None, "Ошибка", "Неизвестная роль пользователя")
         sys.exit(1)
-    
+
+    window = create_role_window(session)
+    timeline.mark("окно роли создано")
+
+    QShortcut(QKeySequence("Ctrl+Shift+M"), window).activated.connect(dump_summary)
+    watch_first_paint(window, on_first_paint)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,231 @@
+import pymysql
+from pymysql.constants import ER
+from appointment_changes import ensure_change_tracking
+from booking import ensure_slot_constraint
+from indexes import HOT_PATH_INDEXES, PAYMENT_QUEUE_INDEXES, SLOT_INDEXES, ensure_indexes, existing_indexes
+from rollup import ensure_rollup
+from sequences import ensure_sequences
+
+MIGRATION_LOCK = 'clinic_schema_migration'
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+def create_base_tables(cursor):
+    cursor.execute("""
+        create table if not exists app_user (
+            id int auto_increment primary key,
+            login varchar(50) unique not null,
+            password varchar(100) not null,
+            role enum('ADMIN', 'CHIEF', 'PATIENT') not null,
+            full_name varchar(200) not null,
+            created_at timestamp default current_timestamp
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    cursor.execute("""
+        create table if not exists specialization (
+            id int auto_increment primary key,
+            name varchar(100) not null unique
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    cursor.execute("""
+        create table if not exists doctor (
+            id int auto_increment primary key,
+            full_name varchar(200) not null,
+            specialization_id int not null,
+            phone varchar(20),
+            email varchar(100),
+            foreign key (specialization_id) references specialization(id) on delete cascade
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    cursor.execute("""
+        create table if not exists patient (
+            id int auto_increment primary key,
+            medical_record_number varchar(50) unique not null,
+            full_name varchar(200) not null,
+            date_of_birth date not null,
+            gender enum('М', 'Ж') not null,
+            address text,
+            phone varchar(20),
+            email varchar(100),
+            passport_series varchar(10),
+            passport_number varchar(20),
+            oms_policy varchar(50),
+            dms_policy varchar(50),
+            insurance_company varchar(200),
+            insurance_type enum('ОМС', 'ДМС') default 'ОМС',
+            created_at timestamp default current_timestamp
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    cursor.execute("""
+        create table if not exists appointment (
+            id int auto_increment primary key,
+            patient_id int not null,
+            doctor_id int not null,
+            appointment_date date not null,
+            appointment_time time not null,
+            appointment_type enum('Первичный', 'Повторный', 'Профилактический') not null,
+            status enum('Запланирован', 'Пациент на приёме', 'Завершён', 'Не явился', 'Отменён') default 'Запланирован',
+            cost decimal(10, 2) default 0.00,
+            payment_method enum('Наличные', 'Карта', 'По полису') null,
+            diagnosis text,
+            prescription text,
+            created_at timestamp default current_timestamp,
+            foreign key (patient_id) references patient(id) on delete cascade,
+            foreign key (doctor_id) references doctor(id) on delete cascade
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+
+def link_users_to_patients(cursor):
+    cursor.execute("""
+        select count(*) from information_schema.columns
+        where table_schema = database() and table_name = 'app_user' and column_name = 'patient_id'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("""
+            alter table app_user
+            add column patient_id int null,
+            add unique key uq_app_user_patient (patient_id),
+            add constraint fk_app_user_patient foreign key (patient_id) references patient(id) on delete set null
+        """)
+
+    cursor.execute("""
+        update app_user u
+        join (select full_name, min(id) as id from patient
+              group by full_name having count(*) = 1) p on p.full_name = u.full_name
+        join (select full_name from app_user where role = 'PATIENT'
+              group by full_name having count(*) = 1) single on single.full_name = u.full_name
+        left join app_user linked on linked.patient_id = p.id
+        set u.patient_id = p.id
+        where u.role = 'PATIENT' and u.patient_id is null and linked.id is null
+    """)
+
+    cursor.execute("select count(*) from app_user where role = 'PATIENT' and patient_id is null")
+    unlinked = cursor.fetchone()[0]
+    if unlinked:
+        print(f"Не удалось однозначно связать с медкартой учётных записей пациентов: {unlinked}")
+
+
+def require_indexes(cursor, indexes):
+    ensure_indexes(cursor, indexes)
+
+    known = {}
+    missing = []
+    for table, name, _, _ in indexes:
+        if table not in known:
+            known[table] = existing_indexes(cursor, table)
+        if name not in known[table]:
+            missing.append(name)
+    if missing:
+        raise pymysql.err.OperationalError(0, f"Не созданы обязательные индексы: {', '.join(missing)}")
+
+
+def create_hot_path_indexes(cursor):
+    require_indexes(cursor, HOT_PATH_INDEXES)
+
+
+def create_payment_queue_index(cursor):
+    require_indexes(cursor, PAYMENT_QUEUE_INDEXES)
+
+
+def recheck_slot_index(cursor):
+    require_indexes(cursor, SLOT_INDEXES)
+
+
+MIGRATIONS = [
+    (1, "Базовые таблицы", create_base_tables),
+    (2, "Уникальность активного слота врача", ensure_slot_constraint),
+    (3, "Индексы для частых запросов", create_hot_path_indexes),
+    (4, "Счётчик номеров медкарт", ensure_sequences),
+    (5, "Сводная таблица по дням и триггеры", ensure_rollup),
+    (6, "Связь учётной записи пациента с медкартой", link_users_to_patients),
+    (7, "Индекс очереди оплаты", create_payment_queue_index),
+    (8, "Отметка времени изменения записи", ensure_change_tracking),
+    (9, "Повторная проверка уникальности активного слота", recheck_slot_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(cursor):
+    try:
+        cursor.execute("select max(version) from schema_version")
+    except pymysql.ProgrammingError as e:
+        if e.args and e.args[0] == ER.NO_SUCH_TABLE:
+            return 0
+        raise
+    return cursor.fetchone()[0] or 0
+
+
+def apply_migrations(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        create table if not exists schema_version (
+            version int primary key,
+            description varchar(200) not null,
+            applied_at timestamp default current_timestamp
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    version = current_version(cursor)
+    applied = []
+    for migration_version, description, migration in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        migration(cursor)
+        cursor.execute("insert into schema_version (version, description) values (%s, %s)",
+                       (migration_version, description))
+        connection.commit()
+        applied.append(migration_version)
+    cursor.close()
+    return version, applied
+
+
+def migrate(connection):
+    cursor = connection.cursor()
+    version = current_version(cursor)
+    if version >= LATEST_VERSION:
+        cursor.close()
+        return version, []
+
+    cursor.execute("select get_lock(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise pymysql.err.OperationalError(0, "Не удалось дождаться завершения миграций другого клиента")
+
+    try:
+        return apply_migrations(connection)
+    finally:
+        cursor.execute("select release_lock(%s)", (MIGRATION_LOCK,))
+        cursor.close()
+
+
+def main(argv=None):
+    import argparse
+    from db import get_connection, init_database
+
+    parser = argparse.ArgumentParser(description="Обновление схемы базы данных")
+    parser.add_argument('--seed-test-data', action='store_true', help="заполнить пустую базу тестовыми данными")
+    args = parser.parse_args(argv)
+
+    if not init_database(seed_test_data=args.seed_test_data):
+        return 1
+
+    connection = get_connection()
+    if not connection:
+        return 1
+    try:
+        cursor = connection.cursor()
+        print(f"Версия схемы: {current_version(cursor)}")
+        cursor.close()
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
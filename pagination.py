@@ -0,0 +1,203 @@
+from collections import namedtuple
+
+PAGE_SIZE = 200
+
+APPOINTMENT_COLUMNS = """
+    select a.id, p.full_name, d.full_name, a.appointment_date, a.appointment_time,
+    a.appointment_type, a.status, a.cost
+    from appointment a
+    join patient p on a.patient_id = p.id
+    join doctor d on a.doctor_id = d.id
+"""
+
+Page = namedtuple('Page', ['rows', 'direction', 'has_more', 'total_estimate'])
+
+
+def appointment_filter_clause(filters):
+    conditions = []
+    params = []
+
+    if filters.get('date_from'):
+        conditions.append("a.appointment_date >= %s")
+        params.append(filters['date_from'])
+    if filters.get('date_to'):
+        conditions.append("a.appointment_date <= %s")
+        params.append(filters['date_to'])
+    if filters.get('doctor_id'):
+        conditions.append("a.doctor_id = %s")
+        params.append(filters['doctor_id'])
+    if filters.get('status'):
+        conditions.append("a.status = %s")
+        params.append(filters['status'])
+
+    return conditions, params
+
+
+def row_key(row):
+    return row[3], row[4], row[0]
+
+
+def row_matches_filters(row, filters):
+    if filters.get('date_from') and row[3] < filters['date_from']:
+        return False
+    if filters.get('date_to') and row[3] > filters['date_to']:
+        return False
+    if filters.get('status') and row[6] != filters['status']:
+        return False
+    return True
+
+
+def fetch_appointment_row(cursor, appointment_id):
+    cursor.execute(APPOINTMENT_COLUMNS + " where a.id = %s", (appointment_id,))
+    return cursor.fetchone()
+
+
+def keyset_condition(key, descending=True):
+    sign = "<" if descending else ">"
+    appointment_date, appointment_time, appointment_id = key
+    condition = (f"a.appointment_date {sign}= %s and (a.appointment_date {sign} %s or "
+                 f"(a.appointment_date = %s and (a.appointment_time {sign} %s or "
+                 f"(a.appointment_time = %s and a.id {sign} %s))))")
+    return condition, [appointment_date, appointment_date, appointment_date,
+                       appointment_time, appointment_time, appointment_id]
+
+
+def fetch_appointment_page(connection, filters, after=None, before=None, page_size=PAGE_SIZE):
+    conditions, params = appointment_filter_clause(filters)
+
+    if after is not None:
+        condition, condition_params = keyset_condition(after)
+        conditions.append(condition)
+        params.extend(condition_params)
+        order = "desc"
+    elif before is not None:
+        condition, condition_params = keyset_condition(before, descending=False)
+        conditions.append(condition)
+        params.extend(condition_params)
+        order = "asc"
+    else:
+        order = "desc"
+
+    query = APPOINTMENT_COLUMNS
+    if conditions:
+        query += " where " + " and ".join(conditions)
+    query += f" order by a.appointment_date {order}, a.appointment_time {order}, a.id {order} limit %s"
+    params.append(page_size + 1)
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = list(cursor.fetchall())
+    cursor.close()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if order == "asc":
+        rows.reverse()
+    return rows, has_more
+
+
+def approximate_appointment_count(connection, filters):
+    conditions, params = appointment_filter_clause(filters)
+    cursor = connection.cursor()
+
+    if not conditions:
+        cursor.execute("""
+            select table_rows from information_schema.tables
+            where table_schema = database() and table_name = 'appointment'
+        """)
+        result = cursor.fetchone()
+        cursor.close()
+        return int(result[0] or 0) if result else 0
+
+    cursor.execute("explain select a.id from appointment a where " + " and ".join(conditions), params)
+    columns = [column[0].lower() for column in cursor.description]
+    result = cursor.fetchone()
+    cursor.close()
+    if not result:
+        return 0
+
+    explain_row = dict(zip(columns, result))
+    rows = explain_row.get('rows') or 0
+    filtered = explain_row.get('filtered') or 100
+    return int(rows * filtered / 100)
+
+
+class AppointmentPager:
+
+    def __init__(self, page_size=PAGE_SIZE, with_total=True):
+        self.page_size = page_size
+        self.with_total = with_total
+        self.filters = {}
+        self.first_key = None
+        self.last_key = None
+        self.page_number = 0
+        self.has_next = False
+        self.total_estimate = None
+
+    def reset(self, **filters):
+        self.filters = {key: value for key, value in filters.items() if value}
+        self.first_key = None
+        self.last_key = None
+        self.page_number = 0
+        self.has_next = False
+        self.total_estimate = None
+
+    @property
+    def has_previous(self):
+        return self.page_number > 1
+
+    def request(self, direction='first'):
+        filters = dict(self.filters)
+        page_size = self.page_size
+        after = self.last_key if direction == 'next' else None
+        before = self.first_key if direction == 'previous' else None
+        with_total = self.with_total and direction == 'first'
+
+        def fetch(connection):
+            rows, has_more = fetch_appointment_page(connection, filters, after, before, page_size)
+            total = approximate_appointment_count(connection, filters) if with_total else None
+            return Page(rows, direction, has_more, total)
+
+        return fetch
+
+    def apply(self, page):
+        if page.direction != 'first' and not page.rows:
+            if page.direction == 'next':
+                self.has_next = False
+            return None
+
+        if page.direction == 'first':
+            self.page_number = 1
+            self.has_next = page.has_more
+        elif page.direction == 'next':
+            self.page_number += 1
+            self.has_next = page.has_more
+        else:
+            self.page_number = self.page_number - 1 if page.has_more else 1
+            self.has_next = True
+
+        if page.total_estimate is not None:
+            self.total_estimate = page.total_estimate
+
+        if page.rows:
+            self.first_key = row_key(page.rows[0])
+            self.last_key = row_key(page.rows[-1])
+        return page.rows
+
+    def matches(self, row):
+        return row_matches_filters(row, self.filters)
+
+    def covers(self, row):
+        key = row_key(row)
+        if self.page_number > 1 and self.first_key is not None and key > self.first_key:
+            return False
+        return not self.has_next or self.last_key is None or key >= self.last_key
+
+    def describe(self):
+        if self.page_number == 0:
+            return ""
+        text = f"Страница {self.page_number}"
+        if self.total_estimate:
+            pages = max(1, -(-self.total_estimate // self.page_size))
+            text += f" из ~{pages} (≈{self.total_estimate} записей)"
+        return text
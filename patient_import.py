@@ -0,0 +1,284 @@
+import argparse
+import csv
+from collections import namedtuple
+from datetime import datetime
+
+import pymysql
+from pymysql.constants import ER
+from sequences import reserve_medical_record_numbers
+
+BATCH_SIZE = 1000
+MAX_ERRORS_SHOWN = 20
+
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+GENDERS = ('М', 'Ж')
+INSURANCE_TYPES = ('ОМС', 'ДМС')
+
+FIELD_LIMITS = {
+    'full_name': 200,
+    'phone': 20,
+    'email': 100,
+    'passport_series': 10,
+    'passport_number': 20,
+    'policy_number': 50,
+    'insurance_company': 200,
+    'login': 50,
+    'password': 100,
+}
+
+PATIENT_INSERT = """
+    insert into patient (medical_record_number, full_name, date_of_birth, gender,
+    address, phone, email, passport_series, passport_number, oms_policy, dms_policy,
+    insurance_company, insurance_type)
+    values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+USER_INSERT = """
+    insert into app_user (login, password, role, full_name, patient_id)
+    values (%s, %s, 'PATIENT', %s, %s)
+"""
+
+PatientRecord = namedtuple('PatientRecord', [
+    'line', 'full_name', 'date_of_birth', 'gender', 'address', 'phone', 'email',
+    'passport_series', 'passport_number', 'oms_policy', 'dms_policy',
+    'insurance_company', 'insurance_type', 'login', 'password'
+])
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self):
+        lines = [f"Импортировано пациентов: {self.imported}", f"Строк с ошибками: {len(self.errors)}"]
+        for line, message in self.errors[:MAX_ERRORS_SHOWN]:
+            lines.append(f"Строка {line}: {message}")
+        if len(self.errors) > MAX_ERRORS_SHOWN:
+            lines.append(f"... и ещё {len(self.errors) - MAX_ERRORS_SHOWN}")
+        return "\n".join(lines)
+
+
+def parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"неверная дата рождения '{value}'")
+
+
+def validate_row(line, row, default_password=None):
+    values = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+
+    for field, limit in FIELD_LIMITS.items():
+        if len(values.get(field, "")) > limit:
+            raise ValueError(f"поле {field} длиннее {limit} символов")
+
+    full_name = values.get('full_name')
+    if not full_name:
+        raise ValueError("не указано ФИО")
+
+    date_of_birth = parse_date(values.get('date_of_birth', ""))
+
+    gender = values.get('gender', "").upper()
+    if gender not in GENDERS:
+        raise ValueError(f"неверный пол '{values.get('gender', '')}'")
+
+    insurance_type = values.get('insurance_type') or 'ОМС'
+    if insurance_type not in INSURANCE_TYPES:
+        raise ValueError(f"неверный тип страхования '{insurance_type}'")
+
+    password = values.get('password') or default_password
+    if not password:
+        raise ValueError("не указан пароль")
+
+    login = values.get('login') or values.get('email') or None
+    if login and len(login) > FIELD_LIMITS['login']:
+        raise ValueError(f"логин '{login}' длиннее {FIELD_LIMITS['login']} символов")
+
+    policy_number = values.get('policy_number') or None
+    return PatientRecord(
+        line=line,
+        full_name=full_name,
+        date_of_birth=date_of_birth,
+        gender=gender,
+        address=values.get('address') or None,
+        phone=values.get('phone') or None,
+        email=values.get('email') or None,
+        passport_series=values.get('passport_series') or None,
+        passport_number=values.get('passport_number') or None,
+        oms_policy=policy_number if insurance_type == 'ОМС' else None,
+        dms_policy=policy_number if insurance_type == 'ДМС' else None,
+        insurance_company=values.get('insurance_company') or None,
+        insurance_type=insurance_type,
+        login=login,
+        password=password
+    )
+
+
+def open_csv(path):
+    csv_file = open(path, newline='', encoding='utf-8-sig')
+    sample = csv_file.read(4096)
+    csv_file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv_file, csv.DictReader(csv_file, dialect=dialect)
+
+
+def read_records(reader, result, default_password=None):
+    for row in reader:
+        line = reader.line_num
+        try:
+            yield validate_row(line, row, default_password)
+        except ValueError as e:
+            result.add_error(line, str(e))
+
+
+def batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def taken_logins(cursor, logins):
+    if not logins:
+        return set()
+    placeholders = ", ".join(["%s"] * len(logins))
+    cursor.execute(f"select login from app_user where login in ({placeholders})", list(logins))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def assign_logins(cursor, batch, numbers, seen_logins):
+    wanted = [record.login or f"patient_{number}" for record, number in zip(batch, numbers)]
+    taken = taken_logins(cursor, set(wanted)) | seen_logins
+
+    logins = []
+    for login, number in zip(wanted, numbers):
+        if login in taken:
+            suffix = f"_{number}"
+            login = login[:FIELD_LIMITS['login'] - len(suffix)] + suffix
+        taken.add(login)
+        seen_logins.add(login)
+        logins.append(login)
+    return logins
+
+
+def patient_params(record, number):
+    return (
+        number, record.full_name, record.date_of_birth, record.gender, record.address,
+        record.phone, record.email, record.passport_series, record.passport_number,
+        record.oms_policy, record.dms_policy, record.insurance_company, record.insurance_type
+    )
+
+
+def patient_ids(cursor, numbers):
+    placeholders = ", ".join(["%s"] * len(numbers))
+    cursor.execute(f"select medical_record_number, id from patient where medical_record_number in ({placeholders})",
+                   list(numbers))
+    return dict(cursor.fetchall())
+
+
+def insert_batch(connection, batch, result, seen_logins):
+    numbers = reserve_medical_record_numbers(connection, len(batch))
+    cursor = connection.cursor()
+    logins = assign_logins(cursor, batch, numbers, seen_logins)
+
+    try:
+        cursor.executemany(PATIENT_INSERT, [patient_params(record, number)
+                                            for record, number in zip(batch, numbers)])
+        ids = patient_ids(cursor, numbers)
+        cursor.executemany(USER_INSERT, [(login, record.password, record.full_name, ids.get(number))
+                                         for record, number, login in zip(batch, numbers, logins)])
+        connection.commit()
+        result.imported += len(batch)
+    except (pymysql.IntegrityError, pymysql.DataError):
+        connection.rollback()
+        insert_rows(connection, cursor, batch, numbers, logins, result)
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, cursor, batch, numbers, logins, result):
+    for record, number, login in zip(batch, numbers, logins):
+        try:
+            cursor.execute(PATIENT_INSERT, patient_params(record, number))
+            cursor.execute(USER_INSERT, (login, record.password, record.full_name, cursor.lastrowid))
+            connection.commit()
+            result.imported += 1
+        except pymysql.IntegrityError as e:
+            connection.rollback()
+            if e.args and e.args[0] == ER.DUP_ENTRY:
+                result.add_error(record.line, f"логин '{login}' уже занят")
+            else:
+                result.add_error(record.line, str(e))
+        except pymysql.DataError as e:
+            connection.rollback()
+            result.add_error(record.line, str(e))
+
+
+def import_patients(connection, path, batch_size=BATCH_SIZE, default_password=None, progress=None):
+    result = ImportResult()
+    seen_logins = set()
+    csv_file, reader = open_csv(path)
+    try:
+        for batch in batches(read_records(reader, result, default_password), batch_size):
+            insert_batch(connection, batch, result, seen_logins)
+            if progress:
+                progress(result)
+    finally:
+        csv_file.close()
+    return result
+
+
+def write_error_report(path, result):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as report:
+        writer = csv.writer(report)
+        writer.writerow(['line', 'error'])
+        writer.writerows(result.errors)
+
+
+def main(argv=None):
+    from db import get_connection
+
+    parser = argparse.ArgumentParser(description="Импорт пациентов из CSV")
+    parser.add_argument('path')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--password', help="пароль для строк без колонки password")
+    parser.add_argument('--errors', help="файл для отчёта об ошибках")
+    args = parser.parse_args(argv)
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    try:
+        result = import_patients(
+            connection, args.path, args.batch_size, args.password,
+            lambda progress: print(f"Импортировано: {progress.imported}", end='\r')
+        )
+    except (OSError, pymysql.Error) as e:
+        print(f"Ошибка импорта: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    print(result.summary())
+    if args.errors and result.errors:
+        write_error_report(args.errors, result)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+SEARCH_LIMIT = 20
+SEARCH_DELAY_MS = 300
+MIN_SEARCH_LENGTH = 2
+
+SEARCH_COLUMNS = ('medical_record_number', 'full_name', 'phone', 'oms_policy', 'dms_policy')
+
+
+def like_prefix(text):
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+def search_patients(connection, text, limit=SEARCH_LIMIT):
+    text = text.strip()
+    if len(text) < MIN_SEARCH_LENGTH:
+        return []
+
+    pattern = like_prefix(text)
+    parts = []
+    params = []
+    for column in SEARCH_COLUMNS:
+        parts.append(f"""
+            (select id, medical_record_number, full_name from patient
+             where {column} like %s
+             order by {column}
+             limit %s)
+        """)
+        params.extend([pattern, limit])
+
+    query = " union ".join(parts) + " order by full_name limit %s"
+    params.append(limit)
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    patients = cursor.fetchall()
+    cursor.close()
+    return patients
@@ -1,21 +1,43 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QTabWidget, QTableWidget, QTableWidgetItem,
+                             QTableWidget, QTableWidgetItem, QTableView, QAbstractItemView,
                              QPushButton, QLabel, QComboBox, QDateEdit, QTimeEdit,
                              QMessageBox, QGroupBox, QTextEdit)
 from PyQt6.QtCore import QDate, QTime, Qt
 import pymysql
-from config import DB_CONFIG
+from query_executor import QueryExecutor
+from table_models import LazyTableModel, ButtonDelegate
+from booking import SLOT_TAKEN_MESSAGE, SlotTakenError, book_slot
+from reference_cache import get_reference_cache
+from schedule import (SlotAvailability, load_availability, load_slot_bitmaps, slot_label,
+                      working_hours_label)
+from lazy_tabs import LazyTabWidget
+from change_feed import ChangeFeed
 from datetime import datetime, timedelta
 
+MY_APPOINTMENT_COLUMNS = """
+    select a.id, d.full_name, a.appointment_date, a.appointment_time,
+    a.appointment_type, a.status
+    from appointment a
+    join doctor d on a.doctor_id = d.id
+"""
+
+def my_appointment_key(row):
+    return row[2], row[3], row[0]
+
 class PatientWindow(QMainWindow):
 
-    def __init__(self, user_info):
+    def __init__(self, session):
         super().__init__()
-        self.user_info = user_info
-        self.setWindowTitle(f"Пациент - {user_info['full_name']}")
+        self.session = session
+        self.setWindowTitle(f"Пациент - {session.full_name}")
         self.setGeometry(100, 100, 1200, 700)
+        self.query_executor = QueryExecutor(self)
+        self.query_executor.busy_changed.connect(self.show_loading)
+        self.reference_cache = get_reference_cache()
+        self.slot_availability = SlotAvailability()
 
-        self.patient_id = self.get_patient_id()
+        self.patient_id = session.patient_id
+        self.insurance_type = session.insurance_type
         if not self.patient_id:
             QMessageBox.critical(self, "Ошибка", "Не удалось найти данные пациента")
             self.close()
@@ -25,47 +47,40 @@ class PatientWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
         layout = QVBoxLayout()
-        tabs = QTabWidget()
+        self.tabs = LazyTabWidget()
 
-        tabs.addTab(self.create_schedule_tab(), "Расписание врачей")
-        tabs.addTab(self.create_booking_tab(), "Запись на приём")
-        tabs.addTab(self.create_my_appointments_tab(), "Мои записи")
-        tabs.addTab(self.create_medical_record_tab(), "Медицинская карта")
+        self.tabs.add_lazy_tab(self.create_schedule_tab, "Расписание врачей")
+        self.tabs.add_lazy_tab(self.create_booking_tab, "Запись на приём")
+        self.tabs.add_lazy_tab(self.create_my_appointments_tab, "Мои записи")
+        self.tabs.add_lazy_tab(self.create_medical_record_tab, "Медицинская карта")
 
-        layout.addWidget(tabs)
+        layout.addWidget(self.tabs)
         central_widget.setLayout(layout)
 
+        self.change_feed = ChangeFeed(patient_id=self.patient_id, parent=self)
+        self.change_feed.changed.connect(self.merge_my_appointment_changes)
+        self.change_feed.overflow.connect(self.reload_my_appointments)
+        self.change_feed.start()
+
+    def show_loading(self, busy):
+        if busy:
+            self.statusBar().showMessage("Загрузка данных...")
+        else:
+            self.statusBar().clearMessage()
+
     def get_connection(self):
 
         try:
-            return pymysql.connect(**DB_CONFIG)
+            return self.session.connection()
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка подключения к БД: {e}")
             return None
 
-    def get_patient_id(self):
-
-        connection = self.get_connection()
-        if not connection:
-            return None
-
-        try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                select id from patient
-                where full_name = %s
-            """, (self.user_info['full_name'],))
-
-            result = cursor.fetchone()
-            patient_id = result[0] if result else None
-
-            cursor.close()
-            connection.close()
-            return patient_id
-        except pymysql.Error as e:
-            if connection:
-                connection.close()
-            return None
+    def run_query(self, key, fetch, on_result, error_title):
+        self.query_executor.submit(
+            key, fetch, on_result,
+            lambda e: QMessageBox.critical(self, "Ошибка", f"{error_title}: {e}")
+        )
 
     def create_schedule_tab(self):
         widget = QWidget()
@@ -75,7 +90,9 @@ class PatientWindow(QMainWindow):
         filter_layout = QHBoxLayout()
 
         self.schedule_specialization = QComboBox()
-        self.schedule_specialization.addItem("Все специализации", None)
+        self.schedule_specialization.setModel(
+            self.reference_cache.specialization_model(all_label="Все специализации")
+        )
         self.load_specializations_for_schedule()
         self.schedule_specialization.currentIndexChanged.connect(self.load_schedule)
         filter_layout.addWidget(QLabel("Специализация:"))
@@ -89,6 +106,13 @@ class PatientWindow(QMainWindow):
         filter_layout.addWidget(QLabel("Дата:"))
         filter_layout.addWidget(self.schedule_date)
 
+        self.schedule_days = QComboBox()
+        self.schedule_days.addItem("День", 1)
+        self.schedule_days.addItem("Неделя", 7)
+        self.schedule_days.currentIndexChanged.connect(self.load_schedule)
+        filter_layout.addWidget(QLabel("Период:"))
+        filter_layout.addWidget(self.schedule_days)
+
         btn_refresh = QPushButton("Обновить")
         btn_refresh.clicked.connect(self.load_schedule)
         filter_layout.addWidget(btn_refresh)
@@ -107,75 +131,32 @@ class PatientWindow(QMainWindow):
 
     def load_specializations_for_schedule(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
-
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select id, name from specialization order by name")
-            specializations = cursor.fetchall()
-
-            for spec_id, name in specializations:
-                self.schedule_specialization.addItem(name, spec_id)
-
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            if connection:
-                connection.close()
+        self.reference_cache.refresh(self.query_executor)
 
     def load_schedule(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
-
-        try:
-            cursor = connection.cursor()
-
-            spec_id = self.schedule_specialization.currentData()
-            selected_date = self.schedule_date.date().toPyDate()
+        spec_id = self.schedule_specialization.currentData()
+        selected_date = self.schedule_date.date().toPyDate()
+        days = self.schedule_days.currentData() or 1
 
-            query = """
-                select d.id, d.full_name, s.name,
-                       count(case when a.appointment_date = %s and a.status not in ('Отменён', 'Не явился') then 1 end) as booked,
-                       case
-                           when count(case when a.appointment_date = %s and a.status not in ('Отменён', 'Не явился') then 1 end) < 8
-                           then 'Есть места'
-                           else 'Занято'
-                       end as availability
-                from doctor d
-                left join specialization s on d.specialization_id = s.id
-                left join appointment a on d.id = a.doctor_id
-            """
+        def fetch(connection):
+            return load_availability(connection, selected_date, days, spec_id)
 
-            params = [selected_date, selected_date]
-
-            if spec_id:
-                query += " where d.specialization_id = %s"
-                params.append(spec_id)
-
-            query += " group by d.id, d.full_name, s.name"
-
-            cursor.execute(query, params)
-            doctors = cursor.fetchall()
-
-            self.schedule_table.setRowCount(len(doctors))
-            for row, (doctor_id, doctor_name, specialization, booked, availability) in enumerate(doctors):
+        def fill(availability):
+            hours = working_hours_label()
+            self.schedule_table.setRowCount(len(availability))
+            for row, (doctor_id, doctor_name, specialization, day, booked, free) in enumerate(availability):
                 self.schedule_table.setItem(row, 0, QTableWidgetItem(doctor_name))
                 self.schedule_table.setItem(row, 1, QTableWidgetItem(specialization or ""))
-                self.schedule_table.setItem(row, 2, QTableWidgetItem(str(selected_date)))
-                self.schedule_table.setItem(row, 3, QTableWidgetItem("9:00-17:00"))
-                self.schedule_table.setItem(row, 4, QTableWidgetItem(availability))
+                self.schedule_table.setItem(row, 2, QTableWidgetItem(str(day)))
+                self.schedule_table.setItem(row, 3, QTableWidgetItem(hours))
+                self.schedule_table.setItem(
+                    row, 4, QTableWidgetItem(f"Свободно {free} из {booked + free}" if free > 0 else "Занято")
+                )
 
             self.schedule_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки расписания: {e}")
-            if connection:
-                connection.close()
+
+        self.run_query('schedule', fetch, fill, "Ошибка загрузки расписания")
 
     def create_booking_tab(self):
         widget = QWidget()
@@ -184,6 +165,7 @@ class PatientWindow(QMainWindow):
         form_layout = QVBoxLayout()
 
         self.booking_specialization = QComboBox()
+        self.booking_specialization.setModel(self.reference_cache.specialization_model())
         self.load_specializations_for_booking()
         self.booking_specialization.currentIndexChanged.connect(self.load_doctors_for_booking)
         form_layout.addWidget(QLabel("Специализация:"))
@@ -197,17 +179,17 @@ class PatientWindow(QMainWindow):
         self.booking_date.setDate(QDate.currentDate())
         self.booking_date.setMinimumDate(QDate.currentDate())
         self.booking_date.setCalendarPopup(True)
+        self.booking_date.dateChanged.connect(self.load_booking_times)
         form_layout.addWidget(QLabel("Дата приёма:"))
         form_layout.addWidget(self.booking_date)
 
         self.booking_time = QComboBox()
-        self.booking_time.addItems([
-            "09:00", "10:00", "11:00", "12:00", "13:00",
-            "14:00", "15:00", "16:00", "17:00"
-        ])
         form_layout.addWidget(QLabel("Время приёма:"))
         form_layout.addWidget(self.booking_time)
 
+        self.booking_doctor.currentIndexChanged.connect(self.load_booking_times)
+        self.load_doctors_for_booking()
+
         self.booking_cost = QLabel("Стоимость будет рассчитана автоматически")
         form_layout.addWidget(QLabel("Стоимость:"))
         form_layout.addWidget(self.booking_cost)
@@ -225,85 +207,67 @@ class PatientWindow(QMainWindow):
 
     def load_specializations_for_booking(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        self.reference_cache.refresh(self.query_executor)
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select id, name from specialization order by name")
-            specializations = cursor.fetchall()
+    def load_doctors_for_booking(self):
 
-            self.booking_specialization.clear()
-            for spec_id, name in specializations:
-                self.booking_specialization.addItem(name, spec_id)
+        spec_id = self.booking_specialization.currentData()
+        if not spec_id:
+            self.booking_doctor.setModel(self.reference_cache.empty_model())
+        else:
+            self.booking_doctor.setModel(self.reference_cache.doctor_model(spec_id))
+        self.load_booking_times()
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            if connection:
-                connection.close()
+    def load_booking_times(self):
 
-    def load_doctors_for_booking(self):
+        doctor_id = self.booking_doctor.currentData()
+        selected_date = self.booking_date.date().toPyDate()
+        if not doctor_id:
+            self.fill_booking_times([])
+            return
 
-        connection = self.get_connection()
-        if not connection:
+        if self.slot_availability.is_fresh(doctor_id, selected_date):
+            self.fill_booking_times(self.slot_availability.free_slots(doctor_id, selected_date))
             return
 
-        try:
-            spec_id = self.booking_specialization.currentData()
-            if not spec_id:
-                self.booking_doctor.clear()
-                return
+        days = self.slot_availability.days
 
-            cursor = connection.cursor()
-            cursor.execute("""
-                select id, full_name from doctor
-                where specialization_id = %s
-                order by full_name
-            """, (spec_id,))
-            doctors = cursor.fetchall()
+        def fetch(connection):
+            return load_slot_bitmaps(connection, doctor_id, selected_date, days)
 
-            self.booking_doctor.clear()
-            for doctor_id, name in doctors:
-                self.booking_doctor.addItem(name, doctor_id)
+        def fill(bitmaps):
+            self.slot_availability.store(doctor_id, bitmaps)
+            if (self.booking_doctor.currentData() == doctor_id
+                    and self.booking_date.date().toPyDate() == selected_date):
+                self.fill_booking_times(self.slot_availability.free_slots(doctor_id, selected_date))
 
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            if connection:
-                connection.close()
+        self.booking_time.clear()
+        self.run_query('booking_slots', fetch, fill, "Ошибка загрузки свободного времени")
 
-    def calculate_booking_cost(self):
+    def fill_booking_times(self, slots):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        current = self.booking_time.currentText()
+        self.booking_time.clear()
+        self.booking_time.addItems([slot_label(slot) for slot in slots])
+        index = self.booking_time.findText(current)
+        if index >= 0:
+            self.booking_time.setCurrentIndex(index)
 
-        try:
-            cursor = connection.cursor()
-            cursor.execute("select insurance_type from patient where id = %s", (self.patient_id,))
-            result = cursor.fetchone()
+    def refresh_booking_times(self, doctor_id, appointment_date, appointment_time):
 
-            if not result:
-                QMessageBox.warning(self, "Ошибка", "Не найдены данные пациента")
-                return
+        self.slot_availability.mark_taken(doctor_id, appointment_date, appointment_time)
+        if (self.booking_doctor.currentData() == doctor_id
+                and self.booking_date.date().toPyDate() == appointment_date):
+            self.fill_booking_times(self.slot_availability.free_slots(doctor_id, appointment_date))
 
-            insurance_type = result[0]
-            base_cost = 1500.00
+    def booking_cost_value(self):
 
-            if insurance_type == 'ОМС':
-                cost = base_cost * 0.5
-            else:
-                cost = base_cost
+        base_cost = 1500.00
+        return base_cost * 0.5 if self.insurance_type == 'ОМС' else base_cost
 
-            self.booking_cost.setText(f"{cost:.2f} руб.")
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка расчёта: {e}")
-            if connection:
-                connection.close()
+    def calculate_booking_cost(self):
+
+        self.booking_cost.setText(f"{self.booking_cost_value():.2f} руб.")
 
     def book_appointment(self):
 
@@ -315,6 +279,10 @@ class PatientWindow(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Выберите врача")
             return
 
+        if not appointment_time_str:
+            QMessageBox.warning(self, "Ошибка", "Нет свободного времени на выбранную дату")
+            return
+
         try:
             hour, minute = map(int, appointment_time_str.split(':'))
             appointment_time = datetime.strptime(appointment_time_str, "%H:%M").time()
@@ -322,6 +290,11 @@ class PatientWindow(QMainWindow):
             QMessageBox.warning(self, "Ошибка", "Неверный формат времени")
             return
 
+        if not self.slot_availability.is_free(doctor_id, appointment_date, appointment_time):
+            QMessageBox.warning(self, "Ошибка", SLOT_TAKEN_MESSAGE)
+            self.refresh_booking_times(doctor_id, appointment_date, appointment_time)
+            return
+
         connection = self.get_connection()
         if not connection:
             return
@@ -329,37 +302,23 @@ class PatientWindow(QMainWindow):
         try:
             cursor = connection.cursor()
 
-            cursor.execute("""
-                select id from appointment
-                where doctor_id = %s and appointment_date = %s and appointment_time = %s
-                and status not in ('Отменён', 'Не явился')
-            """, (doctor_id, appointment_date, appointment_time))
-
-            if cursor.fetchone():
-                QMessageBox.warning(self, "Ошибка", "Это время уже занято")
-                cursor.close()
-                connection.close()
-                return
+            cost = self.booking_cost_value()
 
-            cursor.execute("select insurance_type from patient where id = %s", (self.patient_id,))
-            insurance_type = cursor.fetchone()[0]
-            base_cost = 1500.00
-            cost = base_cost * 0.5 if insurance_type == 'ОМС' else base_cost
-
-            cursor.execute("""
-                insert into appointment (patient_id, doctor_id, appointment_date, appointment_time,
-                appointment_type, status, cost)
-                values (%s, %s, %s, %s, %s, %s, %s)
-            """, (self.patient_id, doctor_id, appointment_date, appointment_time,
-                  'Первичный', 'Запланирован', cost))
+            book_slot(cursor, self.patient_id, doctor_id, appointment_date, appointment_time,
+                      'Первичный', cost)
 
             connection.commit()
+            self.refresh_booking_times(doctor_id, appointment_date, appointment_time)
             QMessageBox.information(self, "Успех", "Вы записаны на приём")
 
             self.booking_cost.setText("Стоимость будет рассчитана автоматически")
 
             cursor.close()
             connection.close()
+        except SlotTakenError as e:
+            connection.close()
+            self.refresh_booking_times(doctor_id, appointment_date, appointment_time)
+            QMessageBox.warning(self, "Ошибка", str(e))
         except pymysql.Error as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка записи: {e}")
             if connection:
@@ -369,11 +328,19 @@ class PatientWindow(QMainWindow):
         widget = QWidget()
         layout = QVBoxLayout()
 
-        self.my_appointments_table = QTableWidget()
-        self.my_appointments_table.setColumnCount(7)
-        self.my_appointments_table.setHorizontalHeaderLabels([
-            "ID", "Врач", "Дата", "Время", "Тип", "Статус", "Действия"
-        ])
+        self.my_appointments_model = LazyTableModel([
+            ("ID", 0), ("Врач", 1), ("Дата", 2), ("Время", 3), ("Тип", 4), ("Статус", 5),
+            ("Действия", lambda row: None if self.can_cancel(row) else "Нельзя отменить")
+        ], parent=self)
+        self.my_appointments_table = QTableView()
+        self.my_appointments_table.setModel(self.my_appointments_model)
+        self.my_appointments_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.my_appointments_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        cancel_delegate = ButtonDelegate(
+            lambda row: "Отменить" if self.can_cancel(row) else None, self.my_appointments_table
+        )
+        cancel_delegate.clicked.connect(self.on_cancel_button_clicked)
+        self.my_appointments_table.setItemDelegateForColumn(6, cancel_delegate)
         layout.addWidget(self.my_appointments_table)
 
         btn_cancel = QPushButton("Отменить запись")
@@ -390,82 +357,76 @@ class PatientWindow(QMainWindow):
 
     def load_my_appointments(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        patient_id = self.patient_id
 
-        try:
+        def fetch(connection):
             cursor = connection.cursor()
-            cursor.execute("""
-                select a.id, d.full_name, a.appointment_date, a.appointment_time,
-                a.appointment_type, a.status
-                from appointment a
-                join doctor d on a.doctor_id = d.id
+            cursor.execute(MY_APPOINTMENT_COLUMNS + """
                 where a.patient_id = %s
                 order by a.appointment_date desc, a.appointment_time desc
-            """, (self.patient_id,))
+            """, (patient_id,))
             appointments = cursor.fetchall()
-
-            self.my_appointments_table.setRowCount(len(appointments))
-            for row, (app_id, doctor, date, time, app_type, status) in enumerate(appointments):
-                self.my_appointments_table.setItem(row, 0, QTableWidgetItem(str(app_id)))
-                self.my_appointments_table.setItem(row, 1, QTableWidgetItem(doctor))
-                self.my_appointments_table.setItem(row, 2, QTableWidgetItem(str(date)))
-                self.my_appointments_table.setItem(row, 3, QTableWidgetItem(str(time)))
-                self.my_appointments_table.setItem(row, 4, QTableWidgetItem(app_type))
-                self.my_appointments_table.setItem(row, 5, QTableWidgetItem(status))
-
-                from datetime import time as time_class
-                if isinstance(time, timedelta):
-                    total_seconds = int(time.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    time_obj = time_class(hours, minutes)
-                elif isinstance(time, str):
-                    time_parts = time.split(':')
-                    time_obj = time_class(int(time_parts[0]), int(time_parts[1]))
-                else:
-                    time_obj = time
-
-                appointment_datetime = datetime.combine(date, time_obj)
-                time_diff = appointment_datetime - datetime.now()
-
-                if status == 'Запланирован' and time_diff.total_seconds() >= 86400:
-                    btn = QPushButton("Отменить")
-                    btn.setProperty("appointment_id", app_id)
-                    btn.setProperty("appointment_datetime", appointment_datetime)
-                    btn.clicked.connect(self.on_cancel_button_clicked)
-                    self.my_appointments_table.setCellWidget(row, 6, btn)
-                else:
-                    self.my_appointments_table.setItem(row, 6, QTableWidgetItem("Нельзя отменить"))
-
-            self.my_appointments_table.resizeColumnsToContents()
             cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки записей: {e}")
-            if connection:
-                connection.close()
+            return appointments
+
+        self.run_query('my_appointments', fetch, self.fill_my_appointments_table, "Ошибка загрузки записей")
+
+    def merge_my_appointment_changes(self, changes):
+
+        if not self.tabs.is_built(self.create_my_appointments_tab):
+            return
+
+        for change in changes:
+            row = (change.id, change.doctor_name, change.appointment_date, change.appointment_time,
+                   change.appointment_type, change.status)
+            self.my_appointments_model.place_row(change.id, row, my_appointment_key, True, reverse=True)
+
+    def reload_my_appointments(self):
+
+        if self.tabs.is_built(self.create_my_appointments_tab):
+            self.load_my_appointments()
+
+    def fill_my_appointments_table(self, appointments):
+
+        self.my_appointments_model.set_rows(appointments)
+        self.my_appointments_table.resizeColumnsToContents()
+
+    def appointment_datetime(self, appointment_date, appointment_time):
+
+        from datetime import time as time_class
+        if isinstance(appointment_time, timedelta):
+            total_seconds = int(appointment_time.total_seconds())
+            hours = total_seconds // 3600
+            minutes = (total_seconds % 3600) // 60
+            time_obj = time_class(hours, minutes)
+        elif isinstance(appointment_time, str):
+            time_parts = appointment_time.split(':')
+            time_obj = time_class(int(time_parts[0]), int(time_parts[1]))
+        else:
+            time_obj = appointment_time
+
+        return datetime.combine(appointment_date, time_obj)
+
+    def can_cancel(self, row):
+
+        app_id, doctor, date, time, app_type, status = row
+        time_diff = self.appointment_datetime(date, time) - datetime.now()
+        return status == 'Запланирован' and time_diff.total_seconds() >= 86400
 
     def cancel_my_appointment(self):
 
-        current_row = self.my_appointments_table.currentRow()
-        if current_row < 0:
+        row = self.my_appointments_model.row(self.my_appointments_table.currentIndex().row())
+        if row is None:
             QMessageBox.warning(self, "Ошибка", "Выберите запись")
             return
 
-        item = self.my_appointments_table.item(current_row, 0)
-        if item:
-            app_id = int(item.text())
-            self.cancel_appointment_by_id(app_id)
+        self.cancel_appointment_by_id(row[0])
 
-    def on_cancel_button_clicked(self):
+    def on_cancel_button_clicked(self, row_number):
 
-        sender = self.sender()
-        if sender:
-            app_id = sender.property("appointment_id")
-            if app_id:
-                self.cancel_appointment_by_id(app_id)
+        row = self.my_appointments_model.row(row_number)
+        if row:
+            self.cancel_appointment_by_id(row[0])
 
     def cancel_appointment_by_id(self, app_id):
 
@@ -485,42 +446,40 @@ class PatientWindow(QMainWindow):
             result = cursor.fetchone()
             if not result:
                 QMessageBox.warning(self, "Ошибка", "Запись не найдена")
+                connection.close()
                 return
 
             appointment_date, appointment_time, status = result
 
             if status != 'Запланирован':
                 QMessageBox.warning(self, "Ошибка", "Можно отменить только запланированные записи")
+                connection.close()
                 return
 
-            from datetime import time as time_class
-            if isinstance(appointment_time, timedelta):
-                total_seconds = int(appointment_time.total_seconds())
-                hours = total_seconds // 3600
-                minutes = (total_seconds % 3600) // 60
-                time_obj = time_class(hours, minutes)
-            elif isinstance(appointment_time, str):
-                time_parts = appointment_time.split(':')
-                time_obj = time_class(int(time_parts[0]), int(time_parts[1]))
-            else:
-                time_obj = appointment_time
-
-            appointment_datetime = datetime.combine(appointment_date, time_obj)
+            appointment_datetime = self.appointment_datetime(appointment_date, appointment_time)
             time_diff = appointment_datetime - datetime.now()
 
             if time_diff.total_seconds() < 86400:
                 QMessageBox.warning(self, "Ошибка",
                                   "Отмена возможна не позднее чем за 24 часа до приёма")
+                connection.close()
                 return
 
             reply = QMessageBox.question(self, "Подтверждение", "Отменить запись?")
             if reply != QMessageBox.StandardButton.Yes:
+                connection.close()
                 return
 
             cursor.execute("update appointment set status = 'Отменён' where id = %s", (app_id,))
+            cursor.execute(MY_APPOINTMENT_COLUMNS + " where a.id = %s", (app_id,))
+            row = cursor.fetchone()
             connection.commit()
+            self.slot_availability.invalidate()
+            if self.tabs.is_built(self.create_booking_tab):
+                self.load_booking_times()
             QMessageBox.information(self, "Успех", "Запись отменена")
-            self.load_my_appointments()
+            if row:
+                self.my_appointments_model.update_row(row)
 
             cursor.close()
             connection.close()
@@ -543,11 +502,14 @@ class PatientWindow(QMainWindow):
         history_group = QGroupBox("История приёмов")
         history_layout = QVBoxLayout()
 
-        self.medical_record_table = QTableWidget()
-        self.medical_record_table.setColumnCount(6)
-        self.medical_record_table.setHorizontalHeaderLabels([
-            "Дата", "Врач", "Тип", "Диагноз", "Назначения", "Статус"
-        ])
+        self.medical_record_model = LazyTableModel([
+            ("Дата", 0), ("Врач", 1), ("Тип", 2),
+            ("Диагноз", lambda row: row[3] or "Не указан"),
+            ("Назначения", lambda row: row[4] or "Не указаны"),
+            ("Статус", 5)
+        ], parent=self)
+        self.medical_record_table = QTableView()
+        self.medical_record_table.setModel(self.medical_record_model)
         history_layout.addWidget(self.medical_record_table)
 
         btn_refresh = QPushButton("Обновить")
@@ -563,27 +525,18 @@ class PatientWindow(QMainWindow):
 
     def load_medical_record(self):
 
-        connection = self.get_connection()
-        if not connection:
-            return
+        patient_id = self.patient_id
 
-        try:
+        def fetch(connection):
             cursor = connection.cursor()
 
             cursor.execute("""
                 select medical_record_number, full_name, date_of_birth, gender,
                 insurance_type, insurance_company
                 from patient where id = %s
-            """, (self.patient_id,))
+            """, (patient_id,))
 
             patient_info = cursor.fetchone()
-            if patient_info:
-                record_num, name, birthdate, gender, insurance_type, insurance_company = patient_info
-                self.patient_info_label.setText(
-                    f"Номер медкарты: {record_num} | ФИО: {name} | "
-                    f"Дата рождения: {birthdate} | Пол: {gender} | "
-                    f"Тип страхования: {insurance_type} | Страховая: {insurance_company or 'Не указана'}"
-                )
 
             cursor.execute("""
                 select a.appointment_date, d.full_name, a.appointment_type,
@@ -592,31 +545,23 @@ class PatientWindow(QMainWindow):
                 join doctor d on a.doctor_id = d.id
                 where a.patient_id = %s
                 order by a.appointment_date desc, a.appointment_time desc
-            """, (self.patient_id,))
+            """, (patient_id,))
 
             appointments = cursor.fetchall()
+            cursor.close()
+            return patient_info, appointments
 
-            self.medical_record_table.setRowCount(len(appointments))
-            for row, (date, doctor, app_type, diagnosis, prescription, status) in enumerate(appointments):
-                self.medical_record_table.setItem(row, 0, QTableWidgetItem(str(date)))
-                self.medical_record_table.setItem(row, 1, QTableWidgetItem(doctor))
-                self.medical_record_table.setItem(row, 2, QTableWidgetItem(app_type))
-                self.medical_record_table.setItem(row, 3, QTableWidgetItem(diagnosis or "Не указан"))
-                self.medical_record_table.setItem(row, 4, QTableWidgetItem(prescription or "Не указаны"))
-                self.medical_record_table.setItem(row, 5, QTableWidgetItem(status))
+        def fill(result):
+            patient_info, appointments = result
+            if patient_info:
+                record_num, name, birthdate, gender, insurance_type, insurance_company = patient_info
+                self.patient_info_label.setText(
+                    f"Номер медкарты: {record_num} | ФИО: {name} | "
+                    f"Дата рождения: {birthdate} | Пол: {gender} | "
+                    f"Тип страхования: {insurance_type} | Страховая: {insurance_company or 'Не указана'}"
+                )
 
+            self.medical_record_model.set_rows(appointments)
             self.medical_record_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки медкарты: {e}")
-            if connection:
-                connection.close()
 
-            self.medical_record_table.resizeColumnsToContents()
-            cursor.close()
-            connection.close()
-        except pymysql.Error as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка загрузки медкарты: {e}")
-            if connection:
-                connection.close()
+        self.run_query('medical_record', fetch, fill, "Ошибка загрузки медкарты")
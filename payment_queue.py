@@ -0,0 +1,120 @@
+from collections import namedtuple
+
+from pagination import keyset_condition
+from patient_search import search_patients
+
+PAGE_SIZE = 100
+PAYABLE_STATUSES = ('Завершён', 'Запланирован', 'Пациент на приёме')
+
+UNPAID_COLUMNS = """
+    select a.id, p.medical_record_number, p.full_name, d.full_name, a.appointment_date,
+    a.appointment_time, a.status, a.cost
+    from appointment a
+    join patient p on a.patient_id = p.id
+    join doctor d on a.doctor_id = d.id
+"""
+
+PaymentPage = namedtuple('PaymentPage', ['rows', 'append', 'has_more'])
+
+
+def row_key(row):
+    return row[4], row[5], row[0]
+
+
+def fetch_unpaid_page(connection, day=None, patient_ids=None, after=None, page_size=PAGE_SIZE):
+    placeholders = ", ".join(["%s"] * len(PAYABLE_STATUSES))
+    conditions = ["a.payment_method is null", f"a.status in ({placeholders})"]
+    params = list(PAYABLE_STATUSES)
+
+    if patient_ids is not None:
+        if not patient_ids:
+            return [], False
+        conditions.append(f"a.patient_id in ({', '.join(['%s'] * len(patient_ids))})")
+        params.extend(patient_ids)
+    else:
+        conditions.append("a.appointment_date = %s")
+        params.append(day)
+
+    if after is not None:
+        condition, condition_params = keyset_condition(after, descending=False)
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    query = UNPAID_COLUMNS + " where " + " and ".join(conditions)
+    query += " order by a.appointment_date, a.appointment_time, a.id limit %s"
+    params.append(page_size + 1)
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = list(cursor.fetchall())
+    cursor.close()
+    return rows[:page_size], len(rows) > page_size
+
+
+def record_payment(cursor, appointment_id, payment_method):
+    cursor.execute("""
+        update appointment
+        set payment_method = %s
+        where id = %s and payment_method is null
+    """, (payment_method, appointment_id))
+    return cursor.rowcount == 1
+
+
+class PaymentQueue:
+
+    def __init__(self, page_size=PAGE_SIZE):
+        self.page_size = page_size
+        self.day = None
+        self.search_text = ""
+        self.patient_ids = None
+        self.last_key = None
+        self.has_more = False
+
+    def reset(self, day, search_text=""):
+        self.day = day
+        self.search_text = search_text.strip()
+        self.patient_ids = None
+        self.last_key = None
+        self.has_more = False
+
+    def request(self, append=False):
+        day = self.day
+        search_text = self.search_text
+        patient_ids = self.patient_ids
+        after = self.last_key if append else None
+        page_size = self.page_size
+
+        def fetch(connection):
+            ids = patient_ids
+            if search_text and ids is None:
+                ids = [row[0] for row in search_patients(connection, search_text)]
+            rows, has_more = fetch_unpaid_page(connection, day, ids if search_text else None, after, page_size)
+            return PaymentPage(rows, append, has_more), ids
+
+        return fetch
+
+    def apply(self, result):
+        page, patient_ids = result
+        if self.search_text:
+            self.patient_ids = patient_ids
+        if page.rows:
+            self.last_key = row_key(page.rows[-1])
+        self.has_more = page.has_more
+        return page
+
+    def matches(self, change):
+        if change.payment_method is not None or change.status not in PAYABLE_STATUSES:
+            return False
+        if self.search_text:
+            return change.patient_id in (self.patient_ids or ())
+        return change.appointment_date == self.day
+
+    def covers(self, row):
+        return not self.has_more or self.last_key is None or row_key(row) <= self.last_key
+
+    def describe(self, shown):
+        if self.search_text:
+            if not self.patient_ids:
+                return "Пациенты не найдены"
+            return f"Неоплаченные записи найденных пациентов ({len(self.patient_ids)}): {shown}"
+        return f"Неоплаченные записи за {self.day:%d.%m.%Y}: {shown}"
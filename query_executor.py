@@ -0,0 +1,97 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from db import pooled_connection
+from query_metrics import current_handler, handler_context
+
+
+class QuerySignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    progress = pyqtSignal(object)
+
+
+class QueryTask(QRunnable):
+
+    def __init__(self, fetch, signals, with_progress=False, handler=None):
+        super().__init__()
+        self.fetch = fetch
+        self.signals = signals
+        self.with_progress = with_progress
+        self.handler = handler
+
+    def run(self):
+        try:
+            with handler_context(self.handler), pooled_connection() as connection:
+                if self.with_progress:
+                    result = self.fetch(connection, self.signals.progress.emit)
+                else:
+                    result = self.fetch(connection)
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+        self.signals.finished.emit(result)
+
+
+class QueryExecutor(QObject):
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, max_threads=4):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max_threads)
+        self._in_flight = {}
+        self._pending = {}
+
+    def submit(self, key, fetch, on_result, on_error=None, on_progress=None):
+        handler = current_handler()
+        if key in self._in_flight:
+            self._pending[key] = (fetch, on_result, on_error, on_progress, handler)
+            return
+        self._start(key, fetch, on_result, on_error, on_progress, handler)
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._in_flight)
+        return key in self._in_flight
+
+    def wait_for_done(self, msecs=-1):
+        return self.thread_pool.waitForDone(msecs)
+
+    def _start(self, key, fetch, on_result, on_error, on_progress=None, handler=None):
+        signals = QuerySignals()
+        signals.finished.connect(lambda result: self._on_finished(key, on_result, result))
+        signals.failed.connect(lambda error: self._on_failed(key, on_error, error))
+        if on_progress:
+            signals.progress.connect(on_progress)
+        if not self._in_flight:
+            self.busy_changed.emit(True)
+        self._in_flight[key] = signals
+        self.thread_pool.start(QueryTask(fetch, signals, on_progress is not None, handler))
+
+    def _on_finished(self, key, on_result, result):
+        self._in_flight.pop(key, None)
+        if self._start_pending(key):
+            return
+        self._notify_idle()
+        on_result(result)
+
+    def _on_failed(self, key, on_error, error):
+        self._in_flight.pop(key, None)
+        if self._start_pending(key):
+            return
+        self._notify_idle()
+        if on_error:
+            on_error(error)
+        else:
+            print(f"Ошибка фонового запроса: {error}")
+
+    def _notify_idle(self):
+        if not self._in_flight:
+            self.busy_changed.emit(False)
+
+    def _start_pending(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return False
+        self._start(key, *pending)
+        return True
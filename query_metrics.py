@@ -0,0 +1,253 @@
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from pymysql.cursors import Cursor, SSCursor
+from config import QUERY_METRICS_CONFIG
+
+HANDLER_MODULES = ('main', 'auth', 'change_feed')
+HANDLER_WRAPPERS = ('run_query', 'load_appointments_page', 'load_payment_page')
+INTERNAL_MODULES = ('query_metrics', 'query_executor', 'pymysql', 'contextlib', 'threading')
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+slow_query_logger = logging.getLogger('clinic.slow_queries')
+
+_context = threading.local()
+
+
+def normalize_query(query):
+    if isinstance(query, (bytes, bytearray)):
+        query = query[:200].decode('utf-8', 'replace')
+    return re.sub(r"\s+", " ", query).strip()
+
+
+def redact_params(params):
+    if params is None:
+        return "нет"
+    if isinstance(params, str):
+        return params
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: <{type(value).__name__}>" for key, value in params.items()) + "}"
+    if isinstance(params, (list, tuple)):
+        return "[" + ", ".join(f"<{type(value).__name__}>" for value in params) + "]"
+    return f"<{type(params).__name__}>"
+
+
+def short_qualname(code):
+    qualname = getattr(code, 'co_qualname', code.co_name)
+    parts = qualname.split('.<locals>.')[0].split('.')
+    return ".".join(parts[:2])
+
+
+def current_handler(frame=None):
+    frame = frame or sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        if frame.f_code.co_name in HANDLER_WRAPPERS:
+            frame = frame.f_back
+            continue
+        module = frame.f_globals.get('__name__', '')
+        root = module.split('.')[0]
+        if module.endswith('_ui') or module == '__main__':
+            return short_qualname(frame.f_code)
+        if module in HANDLER_MODULES:
+            return f"{module}.{short_qualname(frame.f_code)}"
+        if fallback is None and root not in INTERNAL_MODULES:
+            fallback = f"{module}.{short_qualname(frame.f_code)}"
+        frame = frame.f_back
+    return getattr(_context, 'handler', None) or fallback or "неизвестно"
+
+
+@contextmanager
+def handler_context(handler):
+    previous = getattr(_context, 'handler', None)
+    _context.handler = handler
+    try:
+        yield
+    finally:
+        _context.handler = previous
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class QueryStats:
+
+    def __init__(self, window):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def add(self, elapsed_ms, rows, failed):
+        self.count += 1
+        self.errors += failed
+        self.rows += max(rows or 0, 0)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.latencies.append(elapsed_ms)
+
+    def histogram(self):
+        buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for latency in self.latencies:
+            index = 0
+            while index < len(HISTOGRAM_BUCKETS_MS) and latency > HISTOGRAM_BUCKETS_MS[index]:
+                index += 1
+            buckets[index] += 1
+        return buckets
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rows': self.rows,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': percentile(ordered, 0.5),
+            'p95_ms': percentile(ordered, 0.95),
+            'p99_ms': percentile(ordered, 0.99),
+            'max_ms': self.max_ms,
+            'histogram': self.histogram()
+        }
+
+
+class QueryMetrics:
+
+    def __init__(self, slow_query_ms=200, window=1000):
+        self.slow_query_ms = slow_query_ms
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, handler, query, params, elapsed_ms, rows, failed=False):
+        statement = normalize_query(query)
+        with self._lock:
+            stats = self._stats.get((handler, statement))
+            if stats is None:
+                stats = self._stats[(handler, statement)] = QueryStats(self.window)
+            stats.add(elapsed_ms, rows, failed)
+
+        if elapsed_ms >= self.slow_query_ms:
+            slow_query_logger.warning("%.1f мс, строк: %s, %s: %s; параметры: %s",
+                                      elapsed_ms, rows, handler, statement, redact_params(params))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        with self._lock:
+            return {key: stats.summary() for key, stats in self._stats.items()}
+
+    def by_handler(self):
+        handlers = {}
+        with self._lock:
+            for (handler, _), stats in self._stats.items():
+                combined = handlers.setdefault(handler, QueryStats(self.window))
+                combined.count += stats.count
+                combined.errors += stats.errors
+                combined.rows += stats.rows
+                combined.total_ms += stats.total_ms
+                combined.max_ms = max(combined.max_ms, stats.max_ms)
+                combined.latencies.extend(stats.latencies)
+        return {handler: stats.summary() for handler, stats in handlers.items()}
+
+    def format_summary(self, limit=30):
+        lines = [f"{'Обработчик':<45} {'запросов':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'макс':>8} {'строк':>8}"]
+        handlers = sorted(self.by_handler().items(), key=lambda item: item[1]['p95_ms'], reverse=True)
+        for handler, stats in handlers[:limit]:
+            lines.append(f"{handler:<45} {stats['count']:>8} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                         f"{stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} {stats['rows']:>8}")
+
+        lines.append("")
+        lines.append("Самые медленные запросы (p95, мс):")
+        statements = sorted(self.summary().items(), key=lambda item: item[1]['p95_ms'], reverse=True)
+        for (handler, statement), stats in statements[:limit]:
+            lines.append(f"{stats['p95_ms']:>8.1f}  x{stats['count']:<6} {handler}: {statement[:100]}")
+
+        lines.append("")
+        bounds = [f"≤{bound}" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+        total = [0] * len(bounds)
+        for stats in self.summary().values():
+            total = [left + right for left, right in zip(total, stats['histogram'])]
+        lines.append("Гистограмма, мс: " + ", ".join(f"{bound}: {count}" for bound, count in zip(bounds, total)))
+        return "\n".join(lines)
+
+
+class TimedCursorMixin:
+
+    _in_batch = False
+
+    def _record(self, query, params, started, failed):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        rows = None if failed or not 0 <= self.rowcount < 2 ** 63 else self.rowcount
+        get_metrics().record(current_handler(sys._getframe(2)), query, params, elapsed_ms, rows, failed)
+
+    def execute(self, query, args=None):
+        if self._in_batch:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, args)
+        except Exception:
+            self._record(query, args, started, True)
+            raise
+        self._record(query, args, started, False)
+        return result
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        self._in_batch = True
+        try:
+            result = super().executemany(query, args)
+        except Exception:
+            self._in_batch = False
+            self._record(query, f"{len(args)} наборов", started, True)
+            raise
+        self._in_batch = False
+        self._record(query, f"{len(args)} наборов", started, False)
+        return result
+
+
+class TimedCursor(TimedCursorMixin, Cursor):
+    pass
+
+
+class TimedSSCursor(TimedCursorMixin, SSCursor):
+    pass
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = QueryMetrics(QUERY_METRICS_CONFIG['slow_query_ms'], QUERY_METRICS_CONFIG['window'])
+            configure_slow_query_log(QUERY_METRICS_CONFIG.get('slow_query_log'))
+        return _metrics
+
+
+def configure_slow_query_log(path=None):
+    if slow_query_logger.handlers:
+        return
+    handler = logging.FileHandler(path, encoding='utf-8') if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s медленный запрос: %(message)s"))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.WARNING)
+    slow_query_logger.propagate = False
+
+
+def dump_summary(stream=None):
+    print(get_metrics().format_summary(), file=stream or sys.stdout, flush=True)
@@ -0,0 +1,111 @@
+import time
+
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from config import REFERENCE_CACHE_TTL
+
+
+def fill_model(model, items, all_label=None):
+    model.clear()
+    if all_label is not None:
+        item = QStandardItem(all_label)
+        item.setData(None, Qt.ItemDataRole.UserRole)
+        model.appendRow(item)
+    for item_id, name in items:
+        item = QStandardItem(name)
+        item.setData(item_id, Qt.ItemDataRole.UserRole)
+        model.appendRow(item)
+
+
+class ReferenceCache(QObject):
+
+    changed = pyqtSignal(int)
+
+    def __init__(self, ttl=REFERENCE_CACHE_TTL, parent=None):
+        super().__init__(parent)
+        self.ttl = ttl
+        self.version = 0
+        self.loaded_at = None
+        self.specializations = []
+        self.doctors = []
+        self._loading = False
+        self._specialization_models = {}
+        self._doctor_models = {}
+        self._empty_model = QStandardItemModel(self)
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    @staticmethod
+    def fetch(connection):
+        cursor = connection.cursor()
+        cursor.execute("""
+            select 'S', id, name, null from specialization
+            union all
+            select 'D', id, full_name, specialization_id from doctor
+            order by 3
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def apply(self, rows):
+        self._loading = False
+        self.specializations = [(row_id, name) for kind, row_id, name, _ in rows if kind == 'S']
+        self.doctors = [(row_id, name, spec_id) for kind, row_id, name, spec_id in rows if kind == 'D']
+        self.loaded_at = time.monotonic()
+        self.version += 1
+
+        for (spec_id, all_label), model in self._doctor_models.items():
+            fill_model(model, self.doctor_items(spec_id), all_label)
+        for all_label, model in self._specialization_models.items():
+            fill_model(model, self.specializations, all_label)
+
+        self.changed.emit(self.version)
+
+    def refresh(self, executor, force=False):
+        if force:
+            self.invalidate()
+        if self._loading or not self.is_stale():
+            return
+        self._loading = True
+        executor.submit('reference_data', self.fetch, self.apply, self._on_error)
+
+    def _on_error(self, error):
+        self._loading = False
+        print(f"Ошибка загрузки справочников: {error}")
+
+    def doctor_items(self, spec_id=None):
+        return [(doctor_id, name) for doctor_id, name, doctor_spec_id in self.doctors
+                if spec_id is None or doctor_spec_id == spec_id]
+
+    def empty_model(self):
+        return self._empty_model
+
+    def specialization_model(self, all_label=None):
+        if all_label not in self._specialization_models:
+            model = QStandardItemModel(self)
+            fill_model(model, self.specializations, all_label)
+            self._specialization_models[all_label] = model
+        return self._specialization_models[all_label]
+
+    def doctor_model(self, spec_id=None, all_label=None):
+        key = (spec_id, all_label)
+        if key not in self._doctor_models:
+            model = QStandardItemModel(self)
+            fill_model(model, self.doctor_items(spec_id), all_label)
+            self._doctor_models[key] = model
+        return self._doctor_models[key]
+
+
+_cache = None
+
+
+def get_reference_cache():
+    global _cache
+    if _cache is None:
+        _cache = ReferenceCache()
+    return _cache
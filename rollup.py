@@ -0,0 +1,184 @@
+import sys
+
+import pymysql
+from clinic_stats import STATUSES, COMPLETED, build_statistics
+
+ROLLUP_TABLE = 'appointment_daily_stats'
+
+ROLLUP_UPSERT = """
+    insert into appointment_daily_stats
+    (stat_date, doctor_id, status, appointments, cost_sum, paid_appointments, paid_sum)
+    values ({row}.appointment_date, {row}.doctor_id, {row}.status, {sign}1,
+            {sign}coalesce({row}.cost, 0),
+            {sign}({row}.payment_method is not null),
+            {sign}(case when {row}.payment_method is not null then coalesce({row}.cost, 0) else 0 end))
+    on duplicate key update
+    appointments = appointments + values(appointments),
+    cost_sum = cost_sum + values(cost_sum),
+    paid_appointments = paid_appointments + values(paid_appointments),
+    paid_sum = paid_sum + values(paid_sum)
+"""
+
+TRIGGERS = {
+    'trg_appointment_rollup_insert': f"""
+        create trigger trg_appointment_rollup_insert after insert on appointment
+        for each row
+        {ROLLUP_UPSERT.format(row='new', sign='')}
+    """,
+    'trg_appointment_rollup_delete': f"""
+        create trigger trg_appointment_rollup_delete after delete on appointment
+        for each row
+        {ROLLUP_UPSERT.format(row='old', sign='-')}
+    """,
+    'trg_appointment_rollup_update': f"""
+        create trigger trg_appointment_rollup_update after update on appointment
+        for each row
+        begin
+            if not (old.appointment_date <=> new.appointment_date
+                    and old.doctor_id <=> new.doctor_id
+                    and old.status <=> new.status
+                    and old.cost <=> new.cost
+                    and old.payment_method <=> new.payment_method) then
+                {ROLLUP_UPSERT.format(row='old', sign='-')};
+                {ROLLUP_UPSERT.format(row='new', sign='')};
+            end if;
+        end
+    """,
+}
+
+
+def ensure_rollup(cursor):
+    cursor.execute("""
+        select count(*) from information_schema.tables
+        where table_schema = database() and table_name = %s
+    """, (ROLLUP_TABLE,))
+    table_exists = cursor.fetchone()[0] > 0
+
+    if not table_exists:
+        status_values = ", ".join(f"'{status}'" for status in STATUSES)
+        cursor.execute(f"""
+            create table appointment_daily_stats (
+                stat_date date not null,
+                doctor_id int not null,
+                status enum({status_values}) not null,
+                appointments int not null default 0,
+                cost_sum decimal(14, 2) not null default 0.00,
+                paid_appointments int not null default 0,
+                paid_sum decimal(14, 2) not null default 0.00,
+                primary key (stat_date, doctor_id, status),
+                key idx_daily_stats_doctor (doctor_id, stat_date)
+            ) engine=InnoDB default charset=utf8mb4
+        """)
+
+    cursor.execute("""
+        select trigger_name from information_schema.triggers
+        where trigger_schema = database() and event_object_table = 'appointment'
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, statement in TRIGGERS.items():
+        if name not in existing:
+            cursor.execute(statement)
+
+    return refill_rollup(cursor)
+
+
+def fill_rollup(cursor):
+    cursor.execute("""
+        insert into appointment_daily_stats
+        (stat_date, doctor_id, status, appointments, cost_sum, paid_appointments, paid_sum)
+        select appointment_date, doctor_id, status, count(*), coalesce(sum(cost), 0),
+               sum(payment_method is not null),
+               coalesce(sum(case when payment_method is not null then cost else 0 end), 0)
+        from appointment
+        group by appointment_date, doctor_id, status
+    """)
+
+
+def refill_rollup(cursor):
+    cursor.execute("delete from appointment_daily_stats")
+    fill_rollup(cursor)
+    cursor.execute("select count(*) from appointment_daily_stats")
+    return cursor.fetchone()[0]
+
+
+def rebuild_rollup(connection):
+    cursor = connection.cursor()
+    rows = refill_rollup(cursor)
+    connection.commit()
+    cursor.close()
+    return rows
+
+
+def rollup_statistics(connection, date_from=None, date_to=None, with_patients=False):
+    query = "select status, sum(appointments), sum(cost_sum) from appointment_daily_stats"
+    params = []
+    if date_from and date_to:
+        query += " where stat_date between %s and %s"
+        params.extend([date_from, date_to])
+    query += " group by status"
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = {status: (int(count or 0), cost) for status, count, cost in cursor.fetchall()}
+
+    patients = None
+    if with_patients:
+        cursor.execute("select count(*) from patient")
+        patients = cursor.fetchone()[0]
+    cursor.close()
+
+    total = sum(count for count, _ in rows.values())
+    status_counts = [rows.get(status, (0, 0))[0] for status in STATUSES]
+    revenue = rows.get(COMPLETED, (0, 0))[1]
+    return build_statistics(total, status_counts, revenue, patients)
+
+
+def doctors_workload(connection, date_from=None, date_to=None):
+    join_condition = "r.doctor_id = d.id"
+    params = [COMPLETED]
+    if date_from and date_to:
+        join_condition += " and r.stat_date between %s and %s"
+        params.extend([date_from, date_to])
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        select d.full_name, s.name,
+               coalesce(sum(r.appointments), 0) as total_appointments,
+               coalesce(sum(case when r.status = %s then r.appointments else 0 end), 0) as completed
+        from doctor d
+        left join specialization s on d.specialization_id = s.id
+        left join appointment_daily_stats r on {join_condition}
+        group by d.id, d.full_name, s.name
+        order by total_appointments desc
+    """, params)
+    doctors = cursor.fetchall()
+    cursor.close()
+    return doctors
+
+
+def main(argv=None):
+    from db import get_connection
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ['rebuild']:
+        print("Использование: python rollup.py rebuild")
+        return 2
+
+    connection = get_connection()
+    if not connection:
+        return 1
+
+    try:
+        rows = rebuild_rollup(connection)
+    except pymysql.Error as e:
+        print(f"Ошибка пересчёта сводной таблицы: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    print(f"Сводная таблица пересчитана: {rows} строк")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
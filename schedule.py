@@ -0,0 +1,122 @@
+from datetime import time, timedelta
+from time import monotonic
+
+SLOT_TIMES = [time(hour, 0) for hour in range(9, 18)]
+
+
+def slot_label(slot):
+    return slot.strftime("%H:%M")
+
+
+def working_hours_label():
+    return f"{slot_label(SLOT_TIMES[0])}-{slot_label(SLOT_TIMES[-1])}"
+
+
+def date_range(date_from, days):
+    return [date_from + timedelta(days=offset) for offset in range(days)]
+
+
+def load_availability(connection, date_from, days=1, spec_id=None):
+    date_to = date_from + timedelta(days=days - 1)
+    slot_placeholders = ", ".join(["%s"] * len(SLOT_TIMES))
+
+    query = f"""
+        select d.id, d.full_name, s.name, a.appointment_date, count(a.id)
+        from doctor d
+        left join specialization s on d.specialization_id = s.id
+        left join appointment a on a.doctor_id = d.id
+            and a.appointment_date between %s and %s
+            and a.active_slot = 1
+            and a.appointment_time in ({slot_placeholders})
+    """
+    params = [date_from, date_to] + list(SLOT_TIMES)
+
+    if spec_id:
+        query += " where d.specialization_id = %s"
+        params.append(spec_id)
+
+    query += " group by d.id, d.full_name, s.name, a.appointment_date"
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    doctors = {}
+    booked = {}
+    for doctor_id, doctor_name, specialization, appointment_date, count in rows:
+        doctors[doctor_id] = (doctor_name, specialization)
+        if appointment_date is not None:
+            booked[(doctor_id, appointment_date)] = count
+
+    availability = []
+    for doctor_id, (doctor_name, specialization) in sorted(doctors.items(), key=lambda item: item[1][0]):
+        for day in date_range(date_from, days):
+            taken = booked.get((doctor_id, day), 0)
+            availability.append((doctor_id, doctor_name, specialization, day, taken, len(SLOT_TIMES) - taken))
+    return availability
+
+
+def load_slot_bitmaps(connection, doctor_id, date_from, days=7):
+    date_to = date_from + timedelta(days=days - 1)
+    slot_placeholders = ", ".join(["%s"] * len(SLOT_TIMES))
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        select appointment_date, bit_or(1 << (field(cast(appointment_time as char), {slot_placeholders}) - 1))
+        from appointment
+        where doctor_id = %s and appointment_date between %s and %s
+        and active_slot = 1
+        and appointment_time in ({slot_placeholders})
+        group by appointment_date
+    """, [slot.strftime("%H:%M:%S") for slot in SLOT_TIMES] + [doctor_id, date_from, date_to] + list(SLOT_TIMES))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    bitmaps = {day: 0 for day in date_range(date_from, days)}
+    for appointment_date, bitmap in rows:
+        bitmaps[appointment_date] = int(bitmap)
+    return bitmaps
+
+
+class SlotAvailability:
+
+    def __init__(self, ttl=60, days=7):
+        self.ttl = ttl
+        self.days = days
+        self._bitmaps = {}
+
+    def is_fresh(self, doctor_id, day):
+        entry = self._bitmaps.get((doctor_id, day))
+        return entry is not None and monotonic() - entry[1] <= self.ttl
+
+    def store(self, doctor_id, bitmaps):
+        loaded_at = monotonic()
+        for day, bitmap in bitmaps.items():
+            self._bitmaps[(doctor_id, day)] = (bitmap, loaded_at)
+
+    def bitmap(self, doctor_id, day):
+        entry = self._bitmaps.get((doctor_id, day))
+        return entry[0] if entry else 0
+
+    def is_free(self, doctor_id, day, slot):
+        if slot not in SLOT_TIMES:
+            return True
+        return not self.bitmap(doctor_id, day) & (1 << SLOT_TIMES.index(slot))
+
+    def free_slots(self, doctor_id, day):
+        bitmap = self.bitmap(doctor_id, day)
+        return [slot for index, slot in enumerate(SLOT_TIMES) if not bitmap & (1 << index)]
+
+    def mark_taken(self, doctor_id, day, slot):
+        if slot not in SLOT_TIMES:
+            return
+        bitmap, loaded_at = self._bitmaps.get((doctor_id, day), (0, monotonic()))
+        self._bitmaps[(doctor_id, day)] = (bitmap | (1 << SLOT_TIMES.index(slot)), loaded_at)
+
+    def invalidate(self, doctor_id=None):
+        if doctor_id is None:
+            self._bitmaps.clear()
+            return
+        for key in [key for key in self._bitmaps if key[0] == doctor_id]:
+            del self._bitmaps[key]
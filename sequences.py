@@ -0,0 +1,46 @@
+import pymysql
+
+MEDICAL_RECORD_SEQUENCE = 'medical_record_number'
+
+
+def ensure_sequences(cursor):
+    cursor.execute("""
+        create table if not exists sequence_counter (
+            name varchar(50) primary key,
+            value bigint not null
+        ) engine=InnoDB default charset=utf8mb4
+    """)
+
+    cursor.execute("select value from sequence_counter where name = %s", (MEDICAL_RECORD_SEQUENCE,))
+    if cursor.fetchone() is None:
+        cursor.execute("""
+            insert into sequence_counter (name, value)
+            select %s, coalesce(max(cast(substring(medical_record_number, 4) as unsigned)), 0)
+            from patient
+            where medical_record_number like 'MR-%%'
+        """, (MEDICAL_RECORD_SEQUENCE,))
+
+
+def reserve_range(connection, name, count=1):
+    cursor = connection.cursor()
+    cursor.execute("""
+        update sequence_counter
+        set value = last_insert_id(value + %s)
+        where name = %s
+    """, (count, name))
+    if cursor.rowcount == 0:
+        cursor.close()
+        raise pymysql.err.OperationalError(0, f"Последовательность {name} не найдена")
+    last = cursor.lastrowid
+    cursor.close()
+    connection.commit()
+    return range(last - count + 1, last + 1)
+
+
+def format_medical_record_number(value):
+    return f"MR-{str(value).zfill(3)}"
+
+
+def reserve_medical_record_numbers(connection, count=1):
+    return [format_medical_record_number(value)
+            for value in reserve_range(connection, MEDICAL_RECORD_SEQUENCE, count)]
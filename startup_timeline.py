@@ -0,0 +1,53 @@
+import threading
+import time
+from datetime import datetime
+
+from config import STARTUP_TIMELINE_LOG
+
+
+class StartupTimeline:
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+        self._lock = threading.Lock()
+
+    def mark(self, label):
+        with self._lock:
+            self.marks.append((label, time.perf_counter() - self.started))
+
+    def elapsed(self, label):
+        for mark_label, elapsed in self.marks:
+            if mark_label == label:
+                return elapsed
+        return None
+
+    def format(self):
+        lines = []
+        previous = 0.0
+        for label, elapsed in sorted(self.marks, key=lambda mark: mark[1]):
+            lines.append(f"{elapsed * 1000:>9.1f} мс  (+{(elapsed - previous) * 1000:>7.1f})  {label}")
+            previous = elapsed
+        return "\n".join(lines)
+
+    def write_log(self, path=STARTUP_TIMELINE_LOG):
+        if not path:
+            return
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(f"Запуск {datetime.now().isoformat(timespec='seconds')}\n{self.format()}\n\n")
+
+
+def watch_first_paint(widget, on_paint):
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+
+    class FirstPaintFilter(QObject):
+
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Type.Paint:
+                watched.removeEventFilter(self)
+                QTimer.singleShot(0, on_paint)
+            return False
+
+    paint_filter = FirstPaintFilter(widget)
+    widget.installEventFilter(paint_filter)
+    return paint_filter
@@ -0,0 +1,190 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QEvent, Qt, pyqtSignal
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication
+
+
+def display_value(value):
+    if value is None:
+        return ""
+    return str(value)
+
+
+class LazyTableModel(QAbstractTableModel):
+
+    fetch_more_requested = pyqtSignal()
+
+    def __init__(self, columns, batch_size=200, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.batch_size = batch_size
+        self._rows = []
+        self._exposed = 0
+        self._has_more = False
+        self._loading = False
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._exposed
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return section + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._exposed:
+            return None
+
+        row = self._rows[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            return row
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+
+        value = self.columns[index.column()][1]
+        if value is None:
+            return None
+        if callable(value):
+            return value(row)
+        return display_value(row[value])
+
+    def row(self, row_number):
+        if 0 <= row_number < self._exposed:
+            return self._rows[row_number]
+        return None
+
+    def set_rows(self, rows, has_more=False):
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._exposed = min(len(self._rows), self.batch_size)
+        self._has_more = has_more
+        self._loading = False
+        self.endResetModel()
+
+    def append_rows(self, rows, has_more=False):
+        self._rows.extend(rows)
+        self._has_more = has_more
+        self._loading = False
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def find_row(self, key, column=0):
+        for row_number, row in enumerate(self._rows):
+            if row[column] == key:
+                return row_number
+        return -1
+
+    def update_row(self, row, column=0):
+        row_number = self.find_row(row[column], column)
+        if row_number < 0:
+            return False
+        self._rows[row_number] = row
+        if row_number < self._exposed:
+            self.dataChanged.emit(self.index(row_number, 0),
+                                  self.index(row_number, len(self.columns) - 1))
+        return True
+
+    def insert_sorted(self, row, key, reverse=False):
+        row_number = 0
+        while row_number < len(self._rows):
+            current = key(self._rows[row_number])
+            if (current < key(row)) if reverse else (current > key(row)):
+                break
+            row_number += 1
+
+        if row_number > self._exposed:
+            self._rows.insert(row_number, row)
+            return
+        self.beginInsertRows(QModelIndex(), row_number, row_number)
+        self._rows.insert(row_number, row)
+        self._exposed += 1
+        self.endInsertRows()
+
+    def place_row(self, row_id, row, key, matches, covers=lambda row: True, reverse=False):
+        row_number = self.find_row(row_id)
+        if row_number >= 0:
+            current = self.row(row_number)
+            if matches and current is not None and key(current) == key(row):
+                self.update_row(row)
+                return
+            self.remove_row(row_number)
+
+        if matches and covers(row):
+            self.insert_sorted(row, key, reverse)
+
+    def remove_row(self, row_number):
+        if not 0 <= row_number < len(self._rows):
+            return
+        if row_number >= self._exposed:
+            del self._rows[row_number]
+            return
+        self.beginRemoveRows(QModelIndex(), row_number, row_number)
+        del self._rows[row_number]
+        self._exposed -= 1
+        self.endRemoveRows()
+
+    def loaded_count(self):
+        return len(self._rows)
+
+    def clear(self):
+        self.set_rows([])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._exposed < len(self._rows) or (self._has_more and not self._loading)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+
+        remaining = len(self._rows) - self._exposed
+        if remaining > 0:
+            count = min(remaining, self.batch_size)
+            self.beginInsertRows(QModelIndex(), self._exposed, self._exposed + count - 1)
+            self._exposed += count
+            self.endInsertRows()
+        elif self._has_more and not self._loading:
+            self._loading = True
+            self.fetch_more_requested.emit()
+
+
+class ButtonDelegate(QStyledItemDelegate):
+
+    clicked = pyqtSignal(int)
+
+    def __init__(self, label, parent=None):
+        super().__init__(parent)
+        self.label = label
+
+    def button_text(self, index):
+        if callable(self.label):
+            return self.label(index.data(Qt.ItemDataRole.UserRole))
+        return self.label
+
+    def paint(self, painter, option, index):
+        text = self.button_text(index)
+        if text is None:
+            super().paint(painter, option, index)
+            return
+
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(2, 2, -2, -2)
+        button.text = text
+        button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and self.button_text(index) is not None:
+            if option.rect.contains(event.position().toPoint()):
+                self.clicked.emit(index.row())
+                return True
+        return super().editorEvent(event, model, option, index)